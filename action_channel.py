@@ -0,0 +1,44 @@
+import queue
+import threading
+
+
+class ActionChannel:
+    """
+    Hands player choices from network threads to the game thread.
+    Every seat (player name) has its own queue, so the game thread sleeps
+    until its player answers instead of polling a shared field.
+    """
+
+    def __init__(self):
+        self.__queues_ = {}
+        self.__lock_ = threading.Lock()
+
+    def __reduce__(self):
+        # Pending choices are not part of a saved game
+        return (ActionChannel, ())
+
+    def _queue(self, seat) -> queue.Queue:
+        with self.__lock_:
+            if seat not in self.__queues_:
+                self.__queues_[seat] = queue.Queue()
+            return self.__queues_[seat]
+
+    def submit(self, seat, choice) -> None:
+        """Puts choice of the seat into its queue, safe to call from any thread."""
+        self._queue(seat).put(choice)
+
+    def clear(self, seat) -> None:
+        """Drops choices sent before the seat was asked for one."""
+        pending = self._queue(seat)
+        while True:
+            try:
+                pending.get_nowait()
+            except queue.Empty:
+                return
+
+    def wait(self, seat, timeout: float = None):
+        """Blocks until the seat sends a choice, returns None after timeout seconds."""
+        try:
+            return self._queue(seat).get(timeout=timeout)
+        except queue.Empty:
+            return None
@@ -0,0 +1,116 @@
+from collections.abc import Awaitable
+from typing import TYPE_CHECKING, List, Optional
+
+from action_channel import ActionChannel
+
+if TYPE_CHECKING:
+    import asyncio
+
+BET_ACTIONS = ('fold', 'call', 'raise', 'check', 'all_in')
+
+# Numbers of the terminal menu and other spellings players may send
+_BET_ALIASES = {'1': 'fold', '2': 'all_in', '3': 'call', '4': 'raise', '7': 'check', '9': 'all_in', 'all': 'all_in'}
+_SKIP_EXCHANGE = '9'
+
+
+class Agent:
+    """
+    Makes the decisions of one seat. GameEngine asks the agent of the seat with
+    a view of the game (see GameEngine.player_view) every time the seat has to act.
+    Returning None means no valid decision: a bet becomes check or fold, an exchange
+    is asked for again a few times before the seat keeps its cards.
+    """
+
+    def decide_bet(self, view: dict) -> Optional[str]:
+        """Returns one of view['allowed_actions']: 'fold', 'call', 'raise', 'check' or 'all_in'."""
+        return 'check' if 'check' in view['allowed_actions'] else 'call'
+
+    def decide_discard(self, view: dict) -> Optional[List[int]]:
+        """Returns indecies (0-4) of cards in view['hand'] to exchange."""
+        return []
+
+
+class AsyncAgent(Agent):
+    """
+    Agent with coroutine decisions. The game thread awaits them on self.loop when
+    it is set (e.g. the server event loop), otherwise on a new event loop.
+    """
+    loop: Optional['asyncio.AbstractEventLoop'] = None
+
+    async def decide_bet(self, view: dict) -> Optional[str]:
+        return Agent.decide_bet(self, view)
+
+    async def decide_discard(self, view: dict) -> Optional[List[int]]:
+        return Agent.decide_discard(self, view)
+
+
+def ask(agent: Agent, decision: str, view: dict):
+    """Returns answer of agent.decision(view), awaits it for async agents."""
+    answer = getattr(agent, decision)(view)
+    if not isinstance(answer, Awaitable):
+        return answer
+    import asyncio # only async agents need it, keeps headless workers from importing it
+    if agent.loop is not None:
+        return asyncio.run_coroutine_threadsafe(answer, agent.loop).result()
+    return asyncio.run(answer)
+
+
+def parse_bet(choice) -> Optional[str]:
+    """Returns action name of a choice typed or clicked by a player, None for unknown ones."""
+    selected = str(choice).lower().strip()
+    selected = _BET_ALIASES.get(selected, selected)
+    return selected if selected in BET_ACTIONS else None
+
+
+def parse_discard(choice) -> Optional[List[int]]:
+    """Returns indecies of cards from text like '1 3 4' (1-based), None when it is not valid."""
+    if choice.strip() == _SKIP_EXCHANGE:
+        return []
+    indecies = []
+    for i in choice.split():
+        if not i.isdigit() or int(i) < 1 or int(i) > 5:
+            return None
+        indecies.append(int(i) - 1)
+    return indecies
+
+
+class ChannelAgent(Agent):
+    """Human player: waits for choices sent through the ActionChannel of the game (network or terminal)."""
+
+    def __init__(self, channel: ActionChannel, seat: str, timeout: float = None):
+        self.channel = channel
+        self.seat = seat
+        self.timeout = timeout
+
+    def decide_bet(self, view: dict) -> Optional[str]:
+        choice = self.channel.wait(self.seat, timeout=self.timeout)
+        return None if choice is None else parse_bet(choice)
+
+    def decide_discard(self, view: dict) -> Optional[List[int]]:
+        choice = self.channel.wait(self.seat, timeout=self.timeout)
+        if choice is None:
+            # Out of time, keep the cards
+            return []
+        return parse_discard(choice)
+
+
+class ScriptedAgent(Agent):
+    """
+    Plays given bets and discards in order, then asks agent then (Agent defaults when not given).
+    Meant for tests and for replaying logged decisions.
+    """
+
+    def __init__(self, bets: List[str] = (), discards: List[List[int]] = (), then: Agent = None):
+        self.bets = list(bets)
+        self.discards = list(discards)
+        self.then = then
+
+    def decide_bet(self, view: dict) -> Optional[str]:
+        if self.bets:
+            return self.bets.pop(0)
+        return self.then.decide_bet(view) if self.then is not None else super().decide_bet(view)
+
+    def decide_discard(self, view: dict) -> Optional[List[int]]:
+        if self.discards:
+            return self.discards.pop(0)
+        return self.then.decide_discard(view) if self.then is not None else super().decide_discard(view)
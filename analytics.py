@@ -0,0 +1,159 @@
+import sys
+from typing import Iterable, Iterator, List, Optional
+
+import pandas as pd
+
+from history import EVENT_FIELDS
+
+# Columns the player stats need, other columns (cards, detail...) are never parsed
+STAT_COLUMNS = ['game', 'hand', 'seat', 'action', 'amount']
+VOLUNTARY_ACTIONS = ['call', 'raise', 'all_in']
+AGGRESSIVE_ACTIONS = ['raise', 'all_in']
+PAID_ACTIONS = ['small_blind', 'big_blind', 'call', 'raise', 'all_in']
+_DTYPES = {'game': 'str', 'hand': 'int64', 'seq': 'int64', 'amount': 'int64', 'bet': 'int64', 'pot': 'int64',
+           'seat': 'category', 'action': 'category', 'raise_amount': 'int64', 'start_card': 'int64'}
+# Columns older hand histories do not have, they are read as these values
+_ADDED_FIELDS = {'raise_amount': 0, 'start_card': 0}
+
+
+def _parquet():
+    try:
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise ImportError("Parquet hand histories need pyarrow (pip install pyarrow)")
+    return pq
+
+
+def _complete(chunk: pd.DataFrame, columns: List[str]) -> pd.DataFrame:
+    """Returns the columns of the chunk in the requested order, adds columns an older file does not have."""
+    missing = {column: value for column, value in _ADDED_FIELDS.items() if column in columns and column not in chunk}
+    if missing:
+        chunk = chunk.assign(**missing)
+    return chunk[columns]
+
+
+def iter_events(paths: Iterable[str], columns: Optional[List[str]] = None,
+                chunksize: int = 1_000_000) -> Iterator[pd.DataFrame]:
+    """
+    Yields given columns of hand history events (see history.EVENT_FIELDS) of the files in chunks
+    of at most chunksize rows. Reads .parquet, .jsonl and .csv files. Parquet and CSV parse only
+    the given columns, JSON Lines records are parsed whole and the columns are picked afterwards.
+    """
+    columns = list(columns or EVENT_FIELDS)
+    dtypes = {column: dtype for column, dtype in _DTYPES.items() if column in columns}
+    for path in paths:
+        if path.endswith('.parquet'):
+            parquet = _parquet().ParquetFile(path)
+            present = [column for column in columns if column in parquet.schema_arrow.names]
+            for batch in parquet.iter_batches(batch_size=chunksize, columns=present):
+                yield _complete(batch.to_pandas(), columns)
+        elif path.endswith('.csv'):
+            for chunk in pd.read_csv(path, usecols=lambda column: column in columns, dtype=dtypes, chunksize=chunksize):
+                yield _complete(chunk, columns)
+        elif path.endswith('.jsonl'):
+            # Pinned types, a game id of digits only must stay a string and 'time' a number
+            for chunk in pd.read_json(path, lines=True, chunksize=chunksize, dtype=dtypes, convert_dates=False):
+                yield _complete(chunk, columns)
+        else:
+            raise ValueError(f"unknown hand history format: {path}")
+
+
+def load_events(paths: Iterable[str], columns: Optional[List[str]] = None) -> pd.DataFrame:
+    """Returns all events of the files as one DataFrame."""
+    chunks = list(iter_events(paths, columns))
+    if not chunks:
+        return pd.DataFrame(columns=list(columns or EVENT_FIELDS))
+    return pd.concat(chunks, ignore_index=True)
+
+
+def convert_to_parquet(paths: Iterable[str], target: str, chunksize: int = 1_000_000) -> int:
+    """Writes events of JSON Lines / CSV hand histories into one Parquet file, returns number of rows."""
+    pq = _parquet()
+    import pyarrow as pa
+
+    writer = None
+    rows = 0
+    try:
+        for chunk in iter_events(paths, chunksize=chunksize):
+            chunk = chunk.assign(cards=chunk['cards'].map(lambda cards: cards if isinstance(cards, str) else ' '.join(cards)),
+                                 detail=chunk['detail'].fillna('').astype(str))
+            table = pa.Table.from_pandas(chunk, preserve_index=False)
+            if writer is None:
+                writer = pq.ParquetWriter(target, table.schema)
+            writer.write_table(table)
+            rows += len(chunk)
+    finally:
+        if writer is not None:
+            writer.close()
+    return rows
+
+
+def _hand_flags(events: pd.DataFrame) -> pd.DataFrame:
+    """Returns one row per (hand, seat) with what the seat did in that hand."""
+    action = events['action'].astype(str)
+    amount = events['amount']
+    flags = pd.DataFrame({
+        'game': events['game'],
+        'hand': events['hand'],
+        'seat': events['seat'].astype(str),
+        'dealt': action == 'deal',
+        'vpip': action.isin(VOLUNTARY_ACTIONS) & (amount > 0),
+        'aggressive': action.isin(AGGRESSIVE_ACTIONS).astype('int64'),
+        'calls': (action == 'call').astype('int64'),
+        'showdown': action == 'show',
+        'won': action == 'win',
+        'paid': amount.where(action.isin(PAID_ACTIONS), 0),
+        'collected': amount.where(action == 'win', 0),
+    })
+    return flags.groupby(['game', 'hand', 'seat'], sort=False).agg({
+        'dealt': 'max', 'vpip': 'max', 'aggressive': 'sum', 'calls': 'sum', 'showdown': 'max',
+        'won': 'max', 'paid': 'sum', 'collected': 'sum',
+    })
+
+
+def player_stats(chunks: Iterable[pd.DataFrame]) -> pd.DataFrame:
+    """
+    Returns stats of every seat from chunks of events (see iter_events):
+    hands, VPIP, aggression factor and frequency, win rate, net chips per hand,
+    went to showdown (WTSD) and won at showdown (W$SD).
+    """
+    per_hand = [_hand_flags(chunk) for chunk in chunks]
+    if not per_hand:
+        return pd.DataFrame()
+    flags = pd.concat(per_hand)
+    if len(per_hand) > 1:
+        # A hand split between two chunks is merged back
+        flags = flags.groupby(level=['game', 'hand', 'seat'], sort=False).agg({
+            'dealt': 'max', 'vpip': 'max', 'aggressive': 'sum', 'calls': 'sum', 'showdown': 'max',
+            'won': 'max', 'paid': 'sum', 'collected': 'sum',
+        })
+    flags = flags[flags['dealt']]
+    flags = flags.assign(won_showdown=flags['won'] & flags['showdown'], net=flags['collected'] - flags['paid'])
+    by_seat = flags.groupby(level='seat')
+    totals = by_seat.agg(hands=('dealt', 'size'), vpip=('vpip', 'mean'), aggressive=('aggressive', 'sum'),
+                         calls=('calls', 'sum'), win_rate=('won', 'mean'), showdowns=('showdown', 'sum'),
+                         showdowns_won=('won_showdown', 'sum'), net_chips=('net', 'sum'))
+    actions = totals['aggressive'] + totals['calls']
+    return pd.DataFrame({
+        'hands': totals['hands'],
+        'vpip': totals['vpip'],
+        'aggression_factor': totals['aggressive'] / totals['calls'].where(totals['calls'] > 0),
+        'aggression_frequency': totals['aggressive'] / actions.where(actions > 0),
+        'win_rate': totals['win_rate'],
+        'chips_per_hand': totals['net_chips'] / totals['hands'],
+        'wtsd': totals['showdowns'] / totals['hands'],
+        'wsd': totals['showdowns_won'] / totals['showdowns'].where(totals['showdowns'] > 0),
+    })
+
+
+def stats_from_files(paths: Iterable[str], chunksize: int = 1_000_000) -> pd.DataFrame:
+    """Returns player_stats of hand history files, reading only the columns the stats need."""
+    return player_stats(iter_events(paths, columns=STAT_COLUMNS, chunksize=chunksize))
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print('Usage: python analytics.py HISTORY_FILE [HISTORY_FILE ...]')
+        sys.exit(1)
+    with pd.option_context('display.float_format', '{:.3f}'.format, 'display.width', 120):
+        print(stats_from_files(sys.argv[1:]))
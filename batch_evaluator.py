@@ -0,0 +1,129 @@
+from itertools import combinations_with_replacement
+
+import numpy as np
+
+from evaluator import (CATEGORY_SHIFT, HIGH_CARD, PAIR, TWO_PAIR, THREE_OF_A_KIND, STRAIGHT,
+                       FLUSH, FULL_HOUSE, FOUR_OF_A_KIND, STRAIGHT_FLUSH, evaluate_ids)
+
+# Rank bitmask of A-2-3-4-5 (bits are rank - 2)
+_WHEEL_MASK = (1 << 12) | 0b1111
+_WHEEL_KICKERS = np.array([5, 4, 3, 2, 1], dtype=np.uint8)
+_RANK_VALUES = np.arange(2, 15, dtype=np.uint8)
+_CHUNK_SIZE = 1 << 20
+
+# Sorted ranks of a hand read as a base-13 number index a table of strengths,
+# flushes use the second half of the table
+_RANK_WEIGHTS = np.array([13 ** 4, 13 ** 3, 13 ** 2, 13, 1], dtype=np.int32)
+_FLUSH_OFFSET = 13 ** 5
+# Compare-exchanges sorting any 5 values, done on whole columns instead of sorting every row
+_SORTING_NETWORK = ((0, 1), (3, 4), (2, 4), (2, 3), (1, 4), (0, 3), (0, 2), (1, 3), (1, 2))
+
+
+def _build_strength_table() -> np.ndarray:
+    table = np.zeros(2 * _FLUSH_OFFSET, dtype=np.int32)
+    for ranks in combinations_with_replacement(range(13), 5):
+        if any(ranks.count(rank) > 4 for rank in ranks):
+            continue
+        idx = sum(rank * weight for rank, weight in zip(ranks, _RANK_WEIGHTS.tolist()))
+        # Suits chosen so that the hand is not a flush
+        table[idx] = evaluate_ids(*[rank * 4 + (i == 0) for i, rank in enumerate(ranks)])
+        if len(set(ranks)) == 5:
+            table[idx + _FLUSH_OFFSET] = evaluate_ids(*[rank * 4 for rank in ranks])
+    return table
+
+
+_STRENGTHS = _build_strength_table()
+
+
+def encode_hands(hands) -> np.ndarray:
+    """Encodes list of 5-card hands (Card objects) into (N, 5) array of card ids."""
+    return np.array([[card.get_id() for card in hand] for hand in hands], dtype=np.uint8).reshape(-1, 5)
+
+
+def _evaluate_chunk(hands: np.ndarray):
+    n = hands.shape[0]
+    ranks = hands >> 2
+    suits = hands & 3
+
+    # Rank histogram of every hand with a single bincount over offset ranks
+    offsets = (np.arange(n, dtype=np.int64) * 13)[:, None]
+    counts = np.bincount((ranks + offsets).ravel(), minlength=n * 13).reshape(n, 13).astype(np.uint8)
+
+    # Ranks ordered by multiplicity first, then by rank, as count * 16 + rank
+    keys = np.where(counts > 0, (counts << 4) | _RANK_VALUES, 0).astype(np.uint8)
+    keys.sort(axis=1)
+    groups = keys[:, :-6:-1]
+    kickers = groups & 0xF
+    first = groups[:, 0] >> 4
+    second = groups[:, 1] >> 4
+
+    flush = (suits == suits[:, :1]).all(axis=1)
+    mask = np.bitwise_or.reduce(np.left_shift(1, ranks, dtype=np.int32), axis=1)
+    distinct = first == 1
+    low_bit = mask & -mask
+    wheel = distinct & (mask == _WHEEL_MASK)
+    straight = distinct & ((mask == low_bit * 31) | wheel)
+
+    categories = np.full(n, HIGH_CARD, dtype=np.uint8)
+    categories[distinct & flush] = FLUSH
+    categories[straight] = STRAIGHT
+    categories[straight & flush] = STRAIGHT_FLUSH
+    categories[first == 2] = PAIR
+    categories[(first == 2) & (second == 2)] = TWO_PAIR
+    categories[first == 3] = THREE_OF_A_KIND
+    categories[(first == 3) & (second == 2)] = FULL_HOUSE
+    categories[first == 4] = FOUR_OF_A_KIND
+
+    kickers[wheel] = _WHEEL_KICKERS
+    return categories, kickers
+
+
+def evaluate_batch(hands: np.ndarray):
+    """
+    Evaluates (N, 5) array of card ids without a Python loop per hand.
+    Returns categories (N,) and kicker ranks (N, 5), most significant kicker first,
+    unused kicker slots are 0. Both match evaluator.evaluate for the same hand.
+    """
+    hands = np.asarray(hands)
+    if hands.ndim != 2 or hands.shape[1] != 5:
+        raise ValueError("hands must be an array of shape (N, 5)")
+    if hands.size and (hands.min() < 0 or hands.max() > 51):
+        raise ValueError("card ids must be between 0 and 51")
+    hands = hands.astype(np.uint8, copy=False)
+
+    n = hands.shape[0]
+    categories = np.empty(n, dtype=np.uint8)
+    kickers = np.empty((n, 5), dtype=np.uint8)
+    # Chunks keep the (N, 13) histograms small when scoring millions of hands
+    for start in range(0, n, _CHUNK_SIZE):
+        stop = start + _CHUNK_SIZE
+        categories[start:stop], kickers[start:stop] = _evaluate_chunk(hands[start:stop])
+    return categories, kickers
+
+
+def batch_strengths(categories: np.ndarray, kickers: np.ndarray) -> np.ndarray:
+    """Packs categories and kickers into strengths comparable with evaluator.evaluate."""
+    strengths = categories.astype(np.int32) << CATEGORY_SHIFT
+    for i, shift in enumerate((16, 12, 8, 4, 0)):
+        strengths |= kickers[:, i].astype(np.int32) << shift
+    return strengths
+
+
+def evaluate_batch_strengths(hands: np.ndarray) -> np.ndarray:
+    """
+    Returns (N,) array of strengths of the hands, same as evaluator.evaluate.
+    Faster than evaluate_batch when only comparing hands, uses a single table lookup per hand.
+    """
+    hands = np.asarray(hands)
+    if hands.ndim != 2 or hands.shape[1] != 5:
+        raise ValueError("hands must be an array of shape (N, 5)")
+    columns = hands.T.astype(np.int32, order='C')
+    ranks = list(columns >> 2)
+    for i, j in _SORTING_NETWORK:
+        ranks[i], ranks[j] = np.minimum(ranks[i], ranks[j]), np.maximum(ranks[i], ranks[j])
+    index = ranks[0]
+    for rank in ranks[1:]:
+        index = index * 13 + rank
+    suits = columns & 3
+    flush = (suits[0] == suits[1]) & (suits[0] == suits[2]) & (suits[0] == suits[3]) & (suits[0] == suits[4])
+    return _STRENGTHS[index + flush * _FLUSH_OFFSET]
@@ -0,0 +1,40 @@
+import pickle
+import sys
+import timeit
+
+from protocol import decode_message, encode_message
+
+# Typical messages of a 6 player table
+FULL_STATE = {
+    'title': 'game_state', 'table_id': 1, 'version': 412, 'pot': 350, 'current_bet': 100,
+    'waiting_for': 'Player3', 'available_actions': ['fold', 'call', 'raise', 'all_in'],
+    'message': 'Player2 raised to 100', 'destined_for': 'Player3', 'spectator': False,
+    'players_info': [
+        {'name': f'Player{i}', 'stack': 1000 - 50 * i, 'hand': 'R♦K B♣J B♣9 R♦4 R♦3' if i == 3 else '',
+         'bet': 50 * (i % 3), 'folded': i == 5, 'all_in': False, 'checked': False}
+        for i in range(1, 7)
+    ],
+}
+DELTA = {'title': 'game_delta', 'base': 412, 'version': 413, 'changes': {'pot': 450, 'waiting_for': 'Player4'},
+         'players': {2: {'stack': 750, 'bet': 100}}}
+ACTION = {'title': 'action', 'choice': 'call'}
+
+
+def bench(name: str, message: dict, number: int) -> None:
+    encoded, pickled = encode_message(message), pickle.dumps(message)
+    results = {
+        'codec encode': timeit.timeit(lambda: encode_message(message), number=number),
+        'codec decode': timeit.timeit(lambda: decode_message(encoded), number=number),
+        'pickle dumps': timeit.timeit(lambda: pickle.dumps(message), number=number),
+        'pickle loads': timeit.timeit(lambda: pickle.loads(pickled), number=number),
+    }
+    print(f"{name}: codec {len(encoded)} B, pickle {len(pickled)} B")
+    for label, seconds in results.items():
+        print(f"  {label}: {seconds / number * 1e6:.2f} us")
+
+
+if __name__ == "__main__":
+    number = int(sys.argv[1]) if len(sys.argv) > 1 else 20_000
+    bench('full state', FULL_STATE, number)
+    bench('delta', DELTA, number)
+    bench('action', ACTION, number)
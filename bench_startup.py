@@ -0,0 +1,53 @@
+import os
+import subprocess
+import sys
+
+# Import time budget (ms) of modules the server and the simulation workers start with,
+# and heavy modules they must not import. Every module is imported in a fresh interpreter.
+BUDGETS = {
+    'evaluator': 30,
+    'game': 80,
+    'session': 80,
+    'lobby': 100,
+    'network': 60,
+    'server': 200,
+    'tournament': 250,
+}
+HEAVY = ('pandas', 'pygame', 'tkinter', 'numpy', 'asyncio')
+ALLOWED = {
+    'server': ('asyncio',),
+    'tournament': ('numpy',),
+}
+
+_PROBE = '''
+import sys, time
+start = time.perf_counter()
+import {module}
+print((time.perf_counter() - start) * 1000)
+print(' '.join(name for name in {heavy!r} if name in sys.modules))
+'''
+
+
+def measure(module: str, runs: int = 5) -> tuple:
+    """Returns best import time (ms) of the module over runs and heavy modules it imported."""
+    here = os.path.dirname(os.path.abspath(__file__))
+    best, heavy = float('inf'), []
+    for _ in range(runs):
+        output = subprocess.run([sys.executable, '-c', _PROBE.format(module=module, heavy=HEAVY)],
+                                cwd=here, capture_output=True, text=True, check=True).stdout.split('\n')
+        best = min(best, float(output[0]))
+        heavy = output[1].split()
+    return best, heavy
+
+
+if __name__ == "__main__":
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    failed = False
+    for module, budget in BUDGETS.items():
+        ms, heavy = measure(module, runs)
+        unexpected = [name for name in heavy if name not in ALLOWED.get(module, ())]
+        ok = ms <= budget and not unexpected
+        failed = failed or not ok
+        note = f"  imports {', '.join(unexpected)}" if unexpected else ''
+        print(f"{module:<12}{ms:>8.1f} ms  (budget {budget} ms)  {'ok' if ok else 'OVER'}{note}")
+    sys.exit(1 if failed else 0)
@@ -0,0 +1,70 @@
+import random
+from collections import Counter
+from typing import List
+
+from agents import Agent
+from evaluator import CATEGORY_SHIFT, PAIR, STRAIGHT, TWO_PAIR, evaluate
+
+
+class Bot(Agent):
+    """
+    Agent playing a seat without a human, it answers in-process right away.
+    Base bot checks or calls everything and never exchanges cards.
+    """
+
+
+class CallingStation(Bot):
+    """Never folds, never raises, never exchanges."""
+
+
+class RandomBot(Bot):
+    """Picks any allowed action and exchanges random cards."""
+
+    def __init__(self, seed=None):
+        self.rng = random.Random(seed)
+
+    def decide_bet(self, view: dict) -> str:
+        return self.rng.choice(view['allowed_actions'])
+
+    def decide_discard(self, view: dict) -> List[int]:
+        return [i for i in range(5) if self.rng.random() < 0.4]
+
+
+class PairsBot(Bot):
+    """
+    Bets by made hand: raises two pair and better, calls a pair, otherwise checks or folds.
+    Keeps straights and better, otherwise keeps paired cards (or the highest card) and draws.
+    """
+
+    def __init__(self, max_bet: int = 200):
+        self.max_bet = max_bet # raises only while the bet stays below it
+
+    def decide_bet(self, view: dict) -> str:
+        allowed = view['allowed_actions']
+        category = evaluate(view['hand']) >> CATEGORY_SHIFT
+        if category >= TWO_PAIR and 'raise' in allowed and view['current_bet'] + view['raise_amount'] <= self.max_bet:
+            return 'raise'
+        if 'check' in allowed:
+            return 'check'
+        if category >= PAIR and 'call' in allowed:
+            return 'call'
+        return 'fold'
+
+    def decide_discard(self, view: dict) -> List[int]:
+        hand = view['hand']
+        if evaluate(hand) >> CATEGORY_SHIFT >= STRAIGHT:
+            return []
+        counts = Counter(card.get_value()[0] for card in hand)
+        discard = [i for i, card in enumerate(hand) if counts[card.get_value()[0]] == 1]
+        if len(discard) == 5:
+            highest = max(range(5), key=lambda i: hand[i].get_value()[0])
+            discard.remove(highest)
+        return discard
+
+
+# Bots selectable by name, e.g. from the tournament command line
+BOTS = {
+    'caller': CallingStation,
+    'random': RandomBot,
+    'pairs': PairsBot,
+}
@@ -1,14 +1,36 @@
 import pygame
 import sys
+from collections import OrderedDict
 from network import Network
-import pickle
-import tkinter as tk
-from tkinter import simpledialog
 
-pygame.init()
+BACKGROUND = (30, 30, 30)
+ACTIVE_FPS = 60
+IDLE_FPS = 10 # when nothing changed, still polls the server and reacts to clicks within 100 ms
+
+class TextCache:
+    """Rendered text surfaces by font, text and color, keeps the max_size most recently used."""
+
+    def __init__(self, max_size: int = 512):
+        self.max_size = max_size
+        self.__surfaces_ = OrderedDict()
+
+    def render(self, font, text: str, color) -> pygame.Surface:
+        key = (id(font), text, color)
+        surface = self.__surfaces_.get(key)
+        if surface is None:
+            surface = font.render(text, True, color)
+            self.__surfaces_[key] = surface
+            if len(self.__surfaces_) > self.max_size:
+                self.__surfaces_.popitem(last=False)
+        else:
+            self.__surfaces_.move_to_end(key)
+        return surface
 
 class Client:
     def __init__(self):
+        # Only the modules the client draws with, pygame.init() would start audio too
+        pygame.display.init()
+        pygame.font.init()
         self.width, self.height = 1200, 800
         self.win = pygame.display.set_mode((self.width, self.height))
         pygame.display.set_caption("Client")
@@ -57,84 +79,135 @@ class Client:
         self.chatbox_rect = pygame.Rect(100, 150, self.width - 200, 300)
         self.chat_lines = ["Welcome to the poker!"]
 
-        self.current_player = "Player2"
+        # Parts of the window that are redrawn on their own, they must not overlap
+        self.pot_rect = pygame.Rect(10, 10, 380, 50)
+        self.bets_rect = pygame.Rect(self.width - 380, 10, 370, 120)
+        self.name_rect = pygame.Rect((self.width - 400) // 2, 20, 400, 55)
+        self.cards_rect = pygame.Rect(self.cards_tab_rect.x - 100, self.cards_tab_rect.y - 2, self.cards_tab_rect.width + 200, self.cards_tab_rect.height + 4)
+        self.waiting_rect = pygame.Rect(self.chatbox_rect.x, self.chatbox_rect.bottom + 5, self.chatbox_rect.width, 40)
+        self.buttons_rect = pygame.Rect(0, self.height - self.button_height - 40, self.width, self.button_height + 20)
 
-    def draw_window(self):
-        self.win.fill((30, 30, 30))
+        # Rendered text is reused while it does not change, the window is only redrawn where it changed
+        self.text_cache = TextCache()
+        self.hand_surfaces = {}
+        self.drawn = {} # rect -> content it shows
+        self.full_redraw = True
 
-        # Draw current pot (top left)
-        pot_surf = self.small_font.render(f"Pot: {self.current_pot}", True, (255, 215, 0))
-        self.win.blit(pot_surf, (20, 20))
+        self.current_player = "Player2"
+
+    def text(self, font, text: str, color) -> pygame.Surface:
+        return self.text_cache.render(font, text, color)
+
+    def hand_surface(self, hand_str: str) -> pygame.Surface:
+        """Returns surface of the hand, cards are rendered once per card and color, hands once per content."""
+        surface = self.hand_surfaces.get(hand_str)
+        if surface is not None:
+            return surface
+        # R and B switch the color of the following letters (see Player.cards_str_line)
+        runs = []
+        text, color = '', (255, 255, 255)
+        for letter in hand_str:
+            if letter in 'RB':
+                if text:
+                    runs.append(self.text(self.small_font, text, color))
+                text, color = '', (255, 0, 0) if letter == 'R' else (0, 0, 0)
+            else:
+                text += letter
+        if text:
+            runs.append(self.text(self.small_font, text, color))
 
-        # Draw current bet and your bet (top right)
-        bet_surf = self.small_font.render(f"Current Bet: {self.current_bet}", True, (173, 216, 230))
-        your_bet_surf = self.small_font.render(f"Your Bet: {self.your_bet}", True, (144, 238, 144))
-        money_surf = self.small_font.render(f"Money: {self.stack}", True, (255, 255, 102))
+        total_width = sum(surf.get_width() for surf in runs)
+        max_height = max((surf.get_height() for surf in runs), default=0)
+        surface = pygame.Surface((total_width, max_height), pygame.SRCALPHA)
+        x = 0
+        for surf in runs:
+            surface.blit(surf, (x, 0))
+            x += surf.get_width()
+        if len(self.hand_surfaces) >= 64:
+            self.hand_surfaces.clear()
+        self.hand_surfaces[hand_str] = surface
+        return surface
+
+    def regions(self) -> list:
+        """Returns (rect, content, draw) of every part of the window, a part is redrawn when its content changes."""
+        return [
+            (self.pot_rect, (self.current_pot,), self.draw_pot),
+            (self.bets_rect, (self.current_bet, self.your_bet, self.stack), self.draw_bets),
+            (self.name_rect, (self.player_name,), self.draw_name),
+            (self.cards_rect, (self.hand,), self.draw_cards),
+            (self.chatbox_rect, tuple(self.chat_lines[-10:]), self.draw_chat),
+            (self.waiting_rect, (self.witing_for,), self.draw_waiting),
+            (self.buttons_rect, tuple(self.button_texts) + tuple(tuple(rect) for rect in self.buttons), self.draw_buttons),
+        ]
+
+    def draw_window(self) -> list:
+        """Redraws changed parts of the window, returns their rects (empty when nothing changed)."""
+        if self.full_redraw:
+            self.win.fill(BACKGROUND)
+            self.drawn = {}
+        dirty = []
+        for rect, content, draw in self.regions():
+            key = tuple(rect)
+            if self.drawn.get(key) == content:
+                continue
+            self.drawn[key] = content
+            self.win.fill(BACKGROUND, rect)
+            draw()
+            dirty.append(rect)
+
+        if self.full_redraw:
+            self.full_redraw = False
+            pygame.display.flip()
+        elif dirty:
+            pygame.display.update(dirty)
+        return dirty
+
+    def draw_pot(self):
+        # Current pot (top left)
+        self.win.blit(self.text(self.small_font, f"Pot: {self.current_pot}", (255, 215, 0)), (20, 20))
+
+    def draw_bets(self):
+        # Current bet, your bet and money (top right)
+        bet_surf = self.text(self.small_font, f"Current Bet: {self.current_bet}", (173, 216, 230))
+        your_bet_surf = self.text(self.small_font, f"Your Bet: {self.your_bet}", (144, 238, 144))
+        money_surf = self.text(self.small_font, f"Money: {self.stack}", (255, 255, 102))
         self.win.blit(bet_surf, (self.width - bet_surf.get_width() - 20, 20))
         self.win.blit(your_bet_surf, (self.width - your_bet_surf.get_width() - 20, 20 + bet_surf.get_height() + 5))
         self.win.blit(money_surf, (self.width - money_surf.get_width() - 20, 20 + bet_surf.get_height() + your_bet_surf.get_height() + 10))
 
-        # Draw player name at top
-        name_surf = self.font.render(self.player_name, True, (255, 255, 255))
+    def draw_name(self):
+        # Player name at top
+        name_surf = self.text(self.font, self.player_name, (255, 255, 255))
         self.win.blit(name_surf, ((self.width - name_surf.get_width()) // 2, 30))
 
-        # Draw "Cards" tab under player name
+    def draw_cards(self):
+        # "Cards" tab under player name
         pygame.draw.rect(self.win, (60, 60, 60), self.cards_tab_rect)
         pygame.draw.rect(self.win, (200, 200, 200), self.cards_tab_rect, 2)
-        # Render each letter of self.hand with color based on escape codes
-        hand_str = str(self.hand)
-        rendered_letters = []
-        i = 0
-        color = (255, 255, 255)
-        while i < len(hand_str):
-            if hand_str[i] == 'R':
-                color = (255, 0, 0)  # red
-                i += 1
-                continue
-            elif hand_str[i] == 'B':
-                color = (0, 0, 0)  # black
-                i += 1
-                continue
-            else:
-                letter = hand_str[i]
-                letter_surf = self.small_font.render(letter, True, color)
-                rendered_letters.append(letter_surf)
-                i += 1
-
-        # Combine rendered letters horizontally
-        total_width = sum(surf.get_width() for surf in rendered_letters)
-        max_height = max((surf.get_height() for surf in rendered_letters), default=0)
-        cards_surf = pygame.Surface((total_width, max_height), pygame.SRCALPHA)
-        x = 0
-        for surf in rendered_letters:
-            cards_surf.blit(surf, (x, 0))
-            x += surf.get_width()
+        cards_surf = self.hand_surface(str(self.hand))
         self.win.blit(cards_surf, (self.cards_tab_rect.x + (self.cards_tab_rect.width - cards_surf.get_width()) // 2,
                             self.cards_tab_rect.y + (self.cards_tab_rect.height - cards_surf.get_height()) // 2))
 
-        # Draw chat/history box
+    def draw_chat(self):
+        # Chat/history box
         pygame.draw.rect(self.win, (50, 50, 50), self.chatbox_rect)
         pygame.draw.rect(self.win, (200, 200, 200), self.chatbox_rect, 2)
-
-        # Draw chat lines
         for i, line in enumerate(self.chat_lines[-10:]):
-            line_surf = self.small_font.render(line, True, (255, 255, 255))
-            self.win.blit(line_surf, (self.chatbox_rect.x + 10, self.chatbox_rect.y + 10 + i * 28))
+            self.win.blit(self.text(self.small_font, line, (255, 255, 255)), (self.chatbox_rect.x + 10, self.chatbox_rect.y + 10 + i * 28))
 
-        # Draw "Current player:" under history
-        current_player_surf = self.small_font.render(f"Waiting for player to make a move: {self.witing_for}", True, (255, 255, 0))
-        self.win.blit(current_player_surf, (self.chatbox_rect.x + 10, self.chatbox_rect.y + self.chatbox_rect.height + 10))
+    def draw_waiting(self):
+        # "Current player:" under history
+        current_player_surf = self.text(self.small_font, f"Waiting for player to make a move: {self.witing_for}", (255, 255, 0))
+        self.win.blit(current_player_surf, (self.waiting_rect.x + 10, self.waiting_rect.y + 5))
 
-        # Draw buttons
+    def draw_buttons(self):
         for i, rect in enumerate(self.buttons):
             pygame.draw.rect(self.win, (100, 100, 250), rect)
             pygame.draw.rect(self.win, (255, 255, 255), rect, 2)
-            text_surf = self.small_font.render(self.button_texts[i], True, (255, 255, 255))
+            text_surf = self.text(self.small_font, self.button_texts[i], (255, 255, 255))
             self.win.blit(text_surf, (rect.x + (self.button_width - text_surf.get_width()) // 2,
                                 rect.y + (self.button_height - text_surf.get_height()) // 2))
 
-        pygame.display.update()
-
     def setup_buttons(self):
         # Only show action buttons if it's this player's turn
         self.buttons = []
@@ -165,6 +238,8 @@ class Client:
 
     def setup_card_exchange(self, is_bad=False):
         if self.available_actions and set(self.available_actions) == set(['1', '2', '3', '4', '5', '9']) and self.witing_for == self.player_name and self.cards_exchange is None:
+            import tkinter as tk # only the exchange dialog needs tkinter
+            from tkinter import simpledialog
             root = tk.Tk()
             root.withdraw()
             if is_bad:
@@ -200,31 +275,34 @@ class Client:
         self.player_name = f"Player{self.playerId}"
         self.current_player = f"Player{self.playerId}"
 
-        is_game_active = n.send("is_game_active")
-        if is_game_active == "True":
-            self.chat_lines.append("Game is already active. Leaving...")
-            print("Game is already active. Leaving...")
+        if self.playerId is None:
+            self.chat_lines.append("Could not connect to the server.")
             run = False
 
+        dirty = True
         while run:
-            clock.tick(60)
+            clock.tick(ACTIVE_FPS if dirty else IDLE_FPS)
 
             self.setup_buttons()
             self.setup_card_exchange()
 
             if self.cards_exchange is not None:
                 print(f"Sending card exchange: {self.cards_exchange}")
-                n.read_broadcast(self.playerId, exchange=self.cards_exchange)
-
-            print("Waiting for broadcast...")
-            data = n.read_broadcast(self.playerId)
+                n.send_exchange(self.playerId, self.cards_exchange)
+                # Hide the dialog until the server pushes the next state
+                self.available_actions = []
 
             if self.action is not None:
                 print(f"Sending action: {self.action}")
-                n.read_broadcast(self.playerId, send_action=self.action)
+                n.send_action(self.playerId, self.action)
                 self.action = None
+                self.available_actions = []
 
-            if data:
+            # Game state is pushed by the server when it changes
+            for data in n.poll():
+                if data is None:
+                    self.add_chat_line("Disconnected from the server.")
+                    continue
                 print("Received broadcast:", data)
                 if 'error' in data:
                     self.add_chat_line(f"Error: {data['error']}")
@@ -236,7 +314,7 @@ class Client:
                     self.available_actions = data.get('available_actions', [])
                     self.message = data.get('message', '')
                     player_infos = data.get('players_info', [])
-                    player_info = player_infos[int(self.playerId) - 1] if player_infos else {}
+                    player_info = next((info for info in player_infos if info.get('name') == self.player_name), {})
                     self.stack = player_info.get('stack', 0)
                     self.hand = player_info.get('hand', 'something')
                     self.your_bet = player_info.get('bet', 0)
@@ -249,21 +327,26 @@ class Client:
             if self.available_actions is not ['1', '2', '3', '4', '5', '9']:
                 self.cards_exchange = None
 
-            for event in pygame.event.get():
+            events = pygame.event.get()
+            for event in events:
                 if event.type == pygame.QUIT:
                     run = False
 
+                elif event.type in (pygame.VIDEOEXPOSE, pygame.WINDOWEXPOSED):
+                    self.full_redraw = True
+
                 elif event.type == pygame.MOUSEBUTTONDOWN:
                     for i, rect in enumerate(self.buttons):
                         if rect.collidepoint(event.pos):
                             self.chat_lines.append(f"You pressed {self.button_texts[i]}")
                             if self.button_texts[i] == "start_game":
                                 print("Starting game...")
-                                n.read_broadcast(self.playerId, start=True)
+                                n.start_game()
                             else:
                                 self.action = self.button_texts[i]
 
-            self.draw_window()
+            # Back to full frame rate as soon as anything happens
+            dirty = bool(self.draw_window()) or bool(events)
 
         pygame.quit()
         sys.exit()
@@ -0,0 +1,105 @@
+from functools import lru_cache
+from itertools import chain, combinations, combinations_with_replacement, permutations
+from math import comb
+
+import numpy as np
+
+from batch_evaluator import evaluate_batch_strengths
+from evaluator import card_id, evaluate_ids
+from game import Deck
+
+
+@lru_cache(maxsize=None)
+def hand_values(start_card: int = 2):
+    """
+    Returns sorted strengths of all hand classes of the deck and their values.
+    Value of a strength is the chance it beats a random hand dealt from the full deck,
+    ties count as half. Calculated from combinations, without dealing every hand.
+    """
+    ranks = range(start_card, 15)
+    counts = {}
+    for hand_ranks in combinations_with_replacement(ranks, 5):
+        multiplicity = [hand_ranks.count(rank) for rank in set(hand_ranks)]
+        if max(multiplicity) > 4:
+            continue
+        ways = 1
+        for count in multiplicity:
+            ways *= comb(4, count)
+        ids = [card_id(rank, 's' if i else 'h') for i, rank in enumerate(hand_ranks)]
+        if len(multiplicity) == 5:
+            # 4 of the suit combinations are flushes
+            ways -= 4
+            flush = evaluate_ids(*[card_id(rank, 's') for rank in hand_ranks])
+            counts[flush] = counts.get(flush, 0) + 4
+        strength = evaluate_ids(*ids)
+        counts[strength] = counts.get(strength, 0) + ways
+
+    strengths = np.array(sorted(counts), dtype=np.int32)
+    ways = np.array([counts[strength] for strength in strengths.tolist()], dtype=np.float64)
+    beaten = np.cumsum(ways) - ways
+    values = (beaten + ways / 2) / ways.sum()
+    return strengths, values
+
+
+@lru_cache(maxsize=None)
+def _draw_combinations(stub_size: int, k: int) -> np.ndarray:
+    """Returns (C(stub_size, k), k) array of all index combinations."""
+    flat = np.fromiter(chain.from_iterable(combinations(range(stub_size), k)), dtype=np.uint8,
+                       count=comb(stub_size, k) * k)
+    return flat.reshape(comb(stub_size, k), k)
+
+
+def _canonical(ids):
+    """Returns suit-isomorphic canonical form of the hand and mapping from hand ids to canonical ids."""
+    best = None
+    best_mapping = None
+    for order in permutations(range(4)):
+        mapping = {cid: (cid & ~3) | order[cid & 3] for cid in ids}
+        key = tuple(sorted(mapping.values()))
+        if best is None or key < best:
+            best = key
+            best_mapping = mapping
+    return best, best_mapping
+
+
+@lru_cache(maxsize=4096)
+def _solve_canonical(hand: tuple, start_card: int) -> dict:
+    """EV of every discard set of the canonical hand, keyed by frozenset of discarded ids."""
+    strengths, values = hand_values(start_card)
+    stub = np.array([cid for cid in (card.get_id() for card in Deck(start_card, shuffle=False).get_cards())
+                     if cid not in hand], dtype=np.uint8)
+    table = {}
+    for k in range(6):
+        draws = stub[_draw_combinations(stub.size, k)]
+        for discarded in combinations(hand, k):
+            kept = np.array([cid for cid in hand if cid not in discarded], dtype=np.uint8)
+            hands = np.concatenate([np.broadcast_to(kept, (draws.shape[0], 5 - k)), draws], axis=1)
+            hand_strengths = evaluate_batch_strengths(hands)
+            table[frozenset(discarded)] = float(values[np.searchsorted(strengths, hand_strengths)].mean())
+    return table
+
+
+def solve_discard(hand: list, start_card: int = 2) -> dict:
+    """
+    Finds EV-optimal cards to exchange by enumerating every draw for all 32 discard sets.
+    EV is the chance the final hand beats a random hand from the deck.
+    Results are memoized by canonical hand, so suit-isomorphic hands are solved once.
+
+    Returns {'discard': [indices], 'ev': best ev, 'table': {(indices): ev}}.
+    """
+    if len(hand) != 5:
+        raise ValueError("hand must have 5 cards")
+    ids = [card.get_id() for card in hand]
+    if len(set(ids)) != 5:
+        raise ValueError("the same card appears more than once")
+    if min(ids) >> 2 < start_card - 2:
+        raise ValueError("hand has cards lower than start_card")
+
+    canonical, mapping = _canonical(ids)
+    canonical_table = _solve_canonical(canonical, start_card)
+    table = {}
+    for k in range(6):
+        for indices in combinations(range(5), k):
+            table[indices] = canonical_table[frozenset(mapping[ids[i]] for i in indices)]
+    best = max(table, key=lambda indices: (table[indices], -len(indices)))
+    return {'discard': list(best), 'ev': table[best], 'table': table}
@@ -0,0 +1,180 @@
+from typing import Callable, List, Optional, Sequence, Union
+
+import numpy as np
+
+from batch_evaluator import evaluate_batch_strengths
+from game import Deck
+
+# Discard strategy of a player: None stands pat, a sequence of indices (0-4)
+# discards those cards of a known hand, a callable gets (B, 5) array of card ids
+# and returns (B, 5) boolean mask of cards to discard.
+Strategy = Union[None, Sequence[int], Callable[[np.ndarray], np.ndarray]]
+
+_Z_SCORES = {0.9: 1.645, 0.95: 1.96, 0.99: 2.576}
+
+# The 10 pairs of positions in a hand, and which two positions every pair counts for
+_PAIRS_I, _PAIRS_J = np.triu_indices(5, k=1)
+_PAIR_POSITIONS = np.zeros((5, 10), dtype=np.float32)
+_PAIR_POSITIONS[_PAIRS_I, np.arange(10)] = 1
+_PAIR_POSITIONS[_PAIRS_J, np.arange(10)] = 1
+_ACE = 12
+
+
+def stand_pat(hands: np.ndarray) -> np.ndarray:
+    """Keeps every card."""
+    return np.zeros(hands.shape, dtype=bool)
+
+
+def draw_to_pairs(hands: np.ndarray) -> np.ndarray:
+    """
+    Keeps straights and better, otherwise keeps paired cards and discards the rest.
+    Without a pair keeps only the highest card.
+    """
+    # Hands as columns (5, N), so every step works on whole columns instead of 5-card rows
+    columns = hands.T.astype(np.int16, order='C')
+    ranks = columns >> 2
+    # Equal ranks of the 10 pairs of positions, then number of other cards of the same rank at every position
+    equal = ranks[_PAIRS_I] == ranks[_PAIRS_J]
+    discard = _PAIR_POSITIONS @ equal.astype(np.float32) == 0
+    no_pair = ~equal.any(axis=0)
+    highest = ranks.argmax(axis=0)
+    discard[highest[no_pair], no_pair.nonzero()[0]] = False
+
+    # Straight and better: flushes, straights (no pair, five ranks in a row or the wheel) and
+    # four of a kind (6 equal pairs), full houses already keep every card
+    suits = columns & 3
+    flush = (suits == suits[0]).all(axis=0)
+    top = ranks.max(axis=0)
+    wheel = (top == _ACE) & (ranks.sum(axis=0) == _ACE + 0 + 1 + 2 + 3)
+    straight = no_pair & ((top - ranks.min(axis=0) == 4) | wheel)
+    discard[:, flush | straight | (equal.sum(axis=0) == 6)] = False
+    return discard.T
+
+
+def _sample_cards(stub: np.ndarray, count: int, trials: int, rng: np.random.Generator) -> np.ndarray:
+    """Draws count distinct cards from stub for every trial (partial Fisher-Yates on all rows at once)."""
+    pool = np.tile(stub, (trials, 1))
+    # Swaps go through flat indices, much cheaper than indexing with (rows, columns) pairs
+    flat = pool.ravel()
+    row_starts = np.arange(0, trials * stub.size, stub.size)
+    for j in range(count):
+        picked = row_starts + rng.integers(j, stub.size, size=trials)
+        chosen = flat[picked]
+        flat[picked] = pool[:, j]
+        pool[:, j] = chosen
+    return pool[:, :count]
+
+
+def simulate_equity(hands: List[Optional[list]], dead_cards: list = (), strategies: Optional[List[Strategy]] = None,
+                    start_card: int = 2, trials: int = 100_000, batch_size: int = 25_000,
+                    tolerance: Optional[float] = None, confidence: float = 0.95, seed=None) -> dict:
+    """
+    Estimates win/tie equity of every player in five-card draw.
+
+    hands      – 5 Card objects for every known hand, None for an unknown hand
+    dead_cards – cards known to be out of the deck (e.g. discarded earlier)
+    strategies – discard strategy of every player, stand pat by default
+    tolerance  – stops early once every player's equity is known within +/- tolerance
+
+    Returns {'trials': n, 'players': [{'win', 'tie', 'equity', 'margin'}, ...]}.
+    """
+    if len(hands) < 2:
+        raise ValueError("at least 2 players are required")
+    if strategies is None:
+        strategies = [None] * len(hands)
+    if len(strategies) != len(hands):
+        raise ValueError("one strategy per player is required")
+    if confidence not in _Z_SCORES:
+        raise ValueError(f"confidence must be one of {sorted(_Z_SCORES)}")
+
+    known = []
+    for hand in hands:
+        if hand is None:
+            known.append(None)
+            continue
+        if len(hand) != 5:
+            raise ValueError("known hands must have 5 cards")
+        known.append(np.array([card.get_id() for card in hand], dtype=np.uint8))
+
+    used = {int(cid) for hand in known if hand is not None for cid in hand}
+    used.update(card.get_id() for card in dead_cards)
+    if sum(len(hand) for hand in known if hand is not None) + len(dead_cards) != len(used):
+        raise ValueError("the same card appears more than once")
+    stub = np.array([cid for cid in (card.get_id() for card in Deck(start_card, shuffle=False).get_cards())
+                     if cid not in used], dtype=np.uint8)
+
+    # Every player gets a block of columns: 5 for an unknown hand, then one
+    # column per card that may be drawn. A known hand is the same in every trial,
+    # so a callable strategy is asked once and its cards are drawn like fixed indices.
+    draws = []
+    needed = 0
+    for hand, strategy in zip(known, strategies):
+        fixed = None
+        if callable(strategy) and hand is not None:
+            fixed = np.asarray(strategy(hand[None, :]), dtype=bool).reshape(5)
+        elif strategy is not None and not callable(strategy):
+            if hand is None:
+                raise ValueError("discard indices require a known hand")
+            fixed = np.zeros(5, dtype=bool)
+            for idx in strategy:
+                if idx < 0 or idx > 4:
+                    raise IndexError("discard index must be between 0 and 4")
+                fixed[idx] = True
+        deal_at = None
+        if hand is None:
+            deal_at = needed
+            needed += 5
+        draws.append((deal_at, needed, fixed))
+        needed += 0 if strategy is None else int(fixed.sum()) if fixed is not None else 5
+    if needed > stub.size:
+        raise ValueError("not enough cards in the deck")
+
+    rng = np.random.default_rng(seed)
+    z = _Z_SCORES[confidence]
+    players = len(hands)
+    wins = np.zeros(players)
+    ties = np.zeros(players)
+    shares = np.zeros(players)
+    shares_sq = np.zeros(players)
+    done = 0
+    while done < trials:
+        size = min(batch_size, trials - done)
+        cards = _sample_cards(stub, needed, size, rng)
+        final = np.empty((players, size, 5), dtype=np.uint8)
+        for i, (hand, strategy, (deal_at, draw_at, fixed)) in enumerate(zip(known, strategies, draws)):
+            start = cards[:, deal_at:deal_at + 5] if hand is None else np.broadcast_to(hand, (size, 5))
+            if strategy is None:
+                final[i] = start
+            elif fixed is not None:
+                final[i] = start
+                final[i][:, fixed] = cards[:, draw_at:draw_at + int(fixed.sum())]
+            else:
+                final[i] = np.where(strategy(start), cards[:, draw_at:draw_at + 5], start)
+
+        strengths = evaluate_batch_strengths(final.reshape(-1, 5)).reshape(players, size)
+        best = strengths == strengths.max(axis=0)
+        winners = best.sum(axis=0)
+        share = best / winners
+
+        wins += (best & (winners == 1)).sum(axis=1)
+        ties += (best & (winners > 1)).sum(axis=1)
+        shares += share.sum(axis=1)
+        shares_sq += (share * share).sum(axis=1)
+        done += size
+
+        if tolerance is not None:
+            mean = shares / done
+            margin = z * np.sqrt(np.maximum(shares_sq / done - mean * mean, 0) / done)
+            if margin.max() <= tolerance:
+                break
+
+    mean = shares / done
+    margin = z * np.sqrt(np.maximum(shares_sq / done - mean * mean, 0) / done)
+    return {
+        'trials': done,
+        'players': [
+            {'win': float(wins[i] / done), 'tie': float(ties[i] / done),
+             'equity': float(mean[i]), 'margin': float(margin[i])}
+            for i in range(players)
+        ],
+    }
@@ -0,0 +1,131 @@
+from itertools import combinations
+
+# Cards are encoded as small integers: card_id = (rank - 2) * 4 + suit_index,
+# so ids 0-51 follow the same rank/suit order Deck uses to build a full deck.
+SUITS = ('s', 'h', 'd', 'c')
+SUIT_INDEX = {suit: i for i, suit in enumerate(SUITS)}
+
+HIGH_CARD = 0
+PAIR = 1
+TWO_PAIR = 2
+THREE_OF_A_KIND = 3
+STRAIGHT = 4
+FLUSH = 5
+FULL_HOUSE = 6
+FOUR_OF_A_KIND = 7
+STRAIGHT_FLUSH = 8
+
+HAND_NAMES = ('High Card', 'Pair', 'Two Pair', 'Three of a Kind', 'Straight',
+              'Flush', 'Full House', 'Four of a Kind', 'Straight Flush')
+
+# Strength layout: category in bits 20-23, then five 4-bit kicker ranks ordered
+# by importance. Comparing two strengths as plain ints compares the hands.
+CATEGORY_SHIFT = 20
+
+_RANK_PRIMES = {2: 2, 3: 3, 4: 5, 5: 7, 6: 11, 7: 13, 8: 17, 9: 19, 10: 23, 11: 29, 12: 31, 13: 37, 14: 41}
+
+
+def card_id(rank: int, suit: str) -> int:
+    """Returns integer id (0-51) of the card."""
+    return (rank - 2) * 4 + SUIT_INDEX[suit]
+
+
+def card_rank(cid: int) -> int:
+    """Returns rank (2-14) of the card id."""
+    return (cid >> 2) + 2
+
+
+def card_suit(cid: int) -> str:
+    """Returns suit letter of the card id."""
+    return SUITS[cid & 3]
+
+
+def _pack(category: int, ranks) -> int:
+    a, b, c, d, e = tuple(ranks) + (0,) * (5 - len(ranks))
+    return category << CATEGORY_SHIFT | a << 16 | b << 12 | c << 8 | d << 4 | e
+
+
+def _straight_high(ranks) -> int:
+    """Returns high card of a straight made of 5 distinct ranks (ordered high to low) or 0."""
+    if ranks[0] - ranks[4] == 4:
+        return ranks[0]
+    if ranks == (14, 5, 4, 3, 2):
+        return 5
+    return 0
+
+
+def _build_tables():
+    """
+    Builds the lookup tables shape by shape, kickers are generated already ordered
+    by multiplicity and rank, so no hand has to be classified (keeps imports fast).
+    """
+    unsuited = {}
+    flushes = {}
+    ranks = range(14, 1, -1)
+    p = _RANK_PRIMES
+
+    for five in combinations(ranks, 5):
+        key = p[five[0]] * p[five[1]] * p[five[2]] * p[five[3]] * p[five[4]]
+        high = _straight_high(five)
+        if high:
+            kickers = (high, high - 1, high - 2, high - 3, high - 4 if high > 5 else 1)
+            unsuited[key] = _pack(STRAIGHT, kickers)
+            flushes[key] = _pack(STRAIGHT_FLUSH, kickers)
+        else:
+            unsuited[key] = _pack(HIGH_CARD, five)
+            flushes[key] = _pack(FLUSH, five)
+
+    for a in ranks:
+        others = [rank for rank in ranks if rank != a]
+        for b in others:
+            unsuited[p[a] ** 4 * p[b]] = _pack(FOUR_OF_A_KIND, (a, b))
+            unsuited[p[a] ** 3 * p[b] ** 2] = _pack(FULL_HOUSE, (a, b))
+        for b, c in combinations(others, 2):
+            unsuited[p[a] ** 3 * p[b] * p[c]] = _pack(THREE_OF_A_KIND, (a, b, c))
+        for b, c, d in combinations(others, 3):
+            unsuited[p[a] ** 2 * p[b] * p[c] * p[d]] = _pack(PAIR, (a, b, c, d))
+
+    for a, b in combinations(ranks, 2):
+        for c in ranks:
+            if c != a and c != b:
+                unsuited[p[a] ** 2 * p[b] ** 2 * p[c]] = _pack(TWO_PAIR, (a, b, c))
+    return unsuited, flushes
+
+
+# Prime product of the ranks identifies the rank multiset, so one dict lookup
+# resolves category and kickers. Flushes have a table of their own.
+_UNSUITED, _FLUSHES = _build_tables()
+_PRIMES = [_RANK_PRIMES[card_rank(cid)] for cid in range(52)]
+
+
+def evaluate_ids(a: int, b: int, c: int, d: int, e: int) -> int:
+    """Returns strength of a 5-card hand given as card ids. Higher is better."""
+    p = _PRIMES
+    key = p[a] * p[b] * p[c] * p[d] * p[e]
+    if not ((a ^ b) | (a ^ c) | (a ^ d) | (a ^ e)) & 3:
+        return _FLUSHES[key]
+    return _UNSUITED[key]
+
+
+def evaluate(hand) -> int:
+    """Returns strength of a 5-card hand of Card objects. Higher is better."""
+    a, b, c, d, e = [card.get_id() for card in hand]
+    return evaluate_ids(a, b, c, d, e)
+
+
+def hand_category(strength: int) -> int:
+    """Returns category (HIGH_CARD..STRAIGHT_FLUSH) of the strength."""
+    return strength >> CATEGORY_SHIFT
+
+
+def hand_kickers(strength: int) -> tuple:
+    """Returns kicker ranks of the strength, most significant first."""
+    return tuple((strength >> shift) & 0xF for shift in (16, 12, 8, 4, 0))
+
+
+def hand_name(strength: int) -> str:
+    """Returns human readable name of the strength."""
+    category = strength >> CATEGORY_SHIFT
+    if category == STRAIGHT_FLUSH and (strength >> 16) & 0xF == 14:
+        return 'Royal Flush'
+    return HAND_NAMES[category]
@@ -1,9 +1,18 @@
+import os
 import random
+from array import array
 from typing import List
-import pandas as pd
-import time
+from collections import deque
+from evaluator import SUITS, card_id, card_rank, card_suit, evaluate, hand_name
+from action_channel import ActionChannel
+from agents import Agent, ChannelAgent, ask
+from pacing import Pacing
+
+# Actions whose event amount is taken from the stack of the seat, see GameEngine._record
+PAID_ACTIONS = ('big_blind', 'small_blind', 'call', 'raise', 'all_in')
 
 class Player():
+    __slots__ = ('__stack_', '__name_', '__hand_')
 
     def __init__(self, money, name="anonymous"):
         self.__stack_ = money
@@ -80,38 +89,87 @@ class Player():
         self.__stack_ += amount
 
 class Card:
+    """Immutable card, one shared instance per card id (0-51), Card(rank, suit) returns it."""
     unicode_dict = {'s': '\u2660', 'h': '\u2665', 'd': '\u2666', 'c': '\u2663', 'red': '\033[0;31m', 'black': '\033[0;30m', 'reset': '\033[0m'}
-       
-    def __init__(self, rank, suit):
+    __slots__ = ('__id_',)
+    __cards_ = []
+    __values_ = []
+    __strings_ = []
+    __codes_ = []
+    __by_code_ = {}
+
+    def __new__(cls, rank, suit):
         # color: s, h, d, c (spade, heart, diamond, club)
-        # color: red, black (card color)
         # rang: 2-14 (2-10, J=11, Q=12, K=13, A=14)
+        if rank not in range(2, 15) or suit not in SUITS:
+            raise ValueError("invalid card")
+        return cls.__cards_[card_id(rank, suit)]
+
+    def __reduce__(self):
+        return (Card.from_id, (self.__id_,))
+
+    @classmethod
+    def from_id(cls, cid: int) -> 'Card':
+        """Returns card with given id."""
+        return cls.__cards_[cid]
+
+    @classmethod
+    def from_code(cls, code: str) -> 'Card':
+        """Returns card with given two letter code (see get_code)."""
+        if code not in cls.__by_code_:
+            raise ValueError(f"invalid card code: {code}")
+        return cls.__by_code_[code]
+
+    @classmethod
+    def _intern_cards(cls):
+        for cid in range(52):
+            card = object.__new__(cls)
+            card.__id_ = cid
+            rank, suit = card_rank(cid), card_suit(cid)
+            color = 'red' if suit in ['h', 'd'] else 'black'
+            rank_str = {11: 'J', 12: 'Q', 13: 'K', 14: 'A'}.get(rank, str(rank))
+            cls.__cards_.append(card)
+            cls.__values_.append((rank, suit))
+            cls.__strings_.append(cls.unicode_dict[color] + cls.unicode_dict[suit] + rank_str + cls.unicode_dict['reset'])
+            cls.__codes_.append({10: 'T'}.get(rank, rank_str) + suit)
+            cls.__by_code_[cls.__codes_[-1]] = card
+
+    def get_id(self) -> int:
+        return self.__id_
 
-        self.__rank_ = rank
-        self.__suit_ = suit
-        self.__color_ = 'red' if suit in ['h', 'd'] else 'black'
-        
     def get_value(self) -> tuple:
         """returns rank and suit of the card"""
-        return (self.__rank_, self.__suit_)
+        return self.__values_[self.__id_]
+
+    def get_code(self) -> str:
+        """Returns plain two letter code of the card, like 'As' or 'Td'."""
+        return self.__codes_[self.__id_]
 
     def __str__(self):
-        if self.__rank_ > 10:
-            rank_str = {11: 'J', 12: 'Q', 13: 'K', 14: 'A'}[self.__rank_]
-        else:
-            rank_str = str(self.__rank_)
-        
-        return_string = self.unicode_dict[self.__color_] + self.unicode_dict[self.__suit_] + str(rank_str) + self.unicode_dict['reset']
-        return return_string
+        return self.__strings_[self.__id_]
+
+Card._intern_cards()
 
 class Deck():
-    
-    def __init__(self, start_card = 2, shuffle=True):
+    """
+    Shuffled buffer of card ids with a read cursor. Cards before the cursor are dealt,
+    discarded cards are appended to the bottom. The first len(full deck) ids always
+    hold every card once, so reset_deck only has to move the cursor back.
+    Every deck shuffles with its own rng (random.Random, shuffler.BatchShuffler or anything
+    with shuffle(seq)), created from seed when not given, so games can be reproduced.
+    """
+    __slots__ = ('__start_card_', '__deck_', '__size_', '__top_', '__rng_')
+
+    def __init__(self, start_card = 2, shuffle=True, seed=None, rng=None):
         if start_card < 2 or start_card > 14:
             raise ValueError("start_card must be between 2 and 14")
         self.__start_card_ = start_card
+        self.__rng_ = rng if rng is not None else random.Random(seed)
 
-        self.__deck_ = [Card(rank, suit) for rank in range(start_card, 15) for suit in ['s', 'h', 'd', 'c']]
+        # Card ids, cards are looked up with Card.from_id when dealt
+        self.__deck_ = array('B', range(card_id(start_card, SUITS[0]), 52))
+        self.__size_ = len(self.__deck_)
+        self.__top_ = 0
 
         if shuffle:
             self.shuffle()
@@ -119,42 +177,94 @@ class Deck():
 
     def __str__(self):
         return_string = 'Deck:\n'
-        for card in self.__deck_:
-            return_string += str(card) + ' '
+        for cid in self.__deck_[self.__top_:]:
+            return_string += str(Card.from_id(cid)) + ' '
         return return_string
+
+    def __len__(self):
+        return len(self.__deck_) - self.__top_
     
+    def get_start_card(self) -> int:
+        return self.__start_card_
+
+    def get_rng(self):
+        """Returns rng the deck shuffles with."""
+        return self.__rng_
+
+    def get_order(self) -> list:
+        """Returns ids of the full deck in current order, the next shuffle starts from it."""
+        return list(self.__deck_[:self.__size_])
+
+    def set_order(self, ids) -> None:
+        """Puts all cards back in given order (see get_order)."""
+        if sorted(ids) != list(range(card_id(self.__start_card_, SUITS[0]), 52)):
+            raise ValueError("order must hold every card of the deck once")
+        self.__deck_ = array('B', ids)
+        self.__top_ = 0
+
+    def get_cards(self) -> list:
+        """Returns cards left in the deck, top card first."""
+        return [Card.from_id(cid) for cid in self.__deck_[self.__top_:]]
+
     def shuffle(self):
-        random.shuffle(self.__deck_)
+        """Shuffles cards left in the deck, discarded cards stay at the bottom."""
+        if self.__top_ == 0 and len(self.__deck_) == self.__size_:
+            self.__rng_.shuffle(self.__deck_)
+            return
+        end = self.__size_ if self.__top_ < self.__size_ else len(self.__deck_)
+        remaining = self.__deck_[self.__top_:end]
+        self.__rng_.shuffle(remaining)
+        self.__deck_[self.__top_:end] = remaining
+
+    def draw(self, count: int = 1) -> list:
+        """Takes count cards from the top of the deck."""
+        top = self.__top_
+        if top + count > len(self.__deck_):
+            raise ValueError("not enough cards in the deck")
+        self.__top_ = top + count
+        return [Card.from_id(cid) for cid in self.__deck_[top:top + count]]
+
+    def discard_to_bottom(self, card) -> None:
+        """Puts card at the bottom of the deck."""
+        self.__deck_.append(card.get_id())
 
     def deal(self, players):
-        try:
-            for i in range(5):
-                for player in players:
-                    player.take_card(self.__deck_.pop(0))
-        except IndexError:
+        top = self.__top_
+        if top + 5 * len(players) > len(self.__deck_):
             raise ValueError("not enough cards in the deck")
-        
+        for i in range(5):
+            for player in players:
+                player.take_card(Card.from_id(self.__deck_[top]))
+                top += 1
+        self.__top_ = top
     
     def reset_deck(self, shuffle=True):
-        self.__deck_ = [Card(rank, suit) for rank in range(self.__start_card_, 15) for suit in ['s', 'h', 'd', 'c']]
+        del self.__deck_[self.__size_:]
+        self.__top_ = 0
         if shuffle:
             self.shuffle()
+        else:
+            self.__deck_[:] = array('B', range(card_id(self.__start_card_, SUITS[0]), 52))
 
     def collect_cards(self, cards):
         """Takes cards from player and puts them back to the deck."""
         for card in cards:
-            self.__deck_.append(card)
+            self.discard_to_bottom(card)
 
     def fill_hands(self, players):
         for player in players:
-            for i in range(5 - len(player.get_player_hand())):
-                player.take_card(self.__deck_.pop(0))
+            for card in self.draw(5 - len(player.get_player_hand())):
+                player.take_card(card)
 
 class GameEngine:
     def __init__(self, players: List[Player], deck: Deck = None,
-                small_blind: int = 25, big_blind: int = 50, raise_amount: int = 10, start_card: int = 2):
+                small_blind: int = 25, big_blind: int = 50, raise_amount: int = 10, start_card: int = 2,
+                action_timeout: float = 60.0, pacing: Pacing = None, history_limit: int = 100,
+                agents: dict = None, seed=None):
+        self.seed = seed # decks of games with the same seed (and the same choices) deal the same cards
+        self.game_id = os.urandom(6).hex()
         if deck is None:
-            self.__deck_ = Deck(start_card=start_card)
+            self.__deck_ = Deck(start_card=start_card, seed=seed)
         else:
             self.__deck_ = deck
         self.__players_ = players
@@ -165,12 +275,18 @@ class GameEngine:
         self.__pot = 0
         self.__current_bet = 0
         self.__players_states = dict()
+        self.__subscribers = []
+        self.state_version = 0
+        self.pacing = Pacing() if pacing is None else pacing
+        self.events = deque(maxlen=1000) # (state_version, message), newest messages win
         self.__red = '\033[0;31m'
         self.__purple = '\033[0;35m'
         self.__clear = '\033[0m'
         self.__blue = '\033[0;34m'
-        self.history = []
+        self.history = deque(maxlen=history_limit) # round histories of the last history_limit hands
         self.round_history = []
+        self.hand_events = [] # structured events of the current hand, see _record
+        self.rounds_played = 0
         for player in self.__players_:
             self.__players_states[player] = {
                 'bet': 0,
@@ -188,16 +304,166 @@ class GameEngine:
         self.message = ''
         self.next = None
 
-        self.selected_choice = None
+        self.actions = ActionChannel()
+        self.action_timeout = action_timeout # seconds, None waits forever
+        self.agents = dict(agents or {}) # player name -> Agent, seats without one wait for the action channel
+        self.decision_log = None # callable(record), gets every decision before it is applied (see wal.TableLog)
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        # Subscribers belong to the running server, not to a saved game
+        state['_GameEngine__subscribers'] = []
+        return state
+
+    def table_state(self) -> dict:
+        """
+        Returns state of the table between hands as plain data (see snapshot.TableStore):
+        settings, seats and stacks, blinds, order and rng of the deck. Hands, bets and histories
+        are not part of it, they only live within a hand.
+        """
+        rng = self.__deck_.get_rng()
+        if isinstance(rng, random.Random):
+            version, internal, gauss = rng.getstate()
+            rng_state = [version, list(internal), gauss]
+        else:
+            rng_state = None # other rngs (shuffler.BatchShuffler) start over after restore
+        return {
+            'game_id': self.game_id,
+            'seed': self.seed,
+            'rounds_played': self.rounds_played,
+            'small_blind': self.__small_blind,
+            'big_blind': self.__big_blind,
+            'raise_amount': self.__raise_amount,
+            'start_card': self.__deck_.get_start_card(),
+            'action_timeout': self.action_timeout,
+            'history_limit': self.history.maxlen,
+            'players': [{'name': player.get_player_name(), 'stack': player.get_stack_amount()} for player in self.__players_],
+            'big_blind_seat': self.__players_.index(self.__current_big_blind),
+            'deck': self.__deck_.get_order(),
+            'rng': rng_state,
+        }
+
+    @classmethod
+    def from_table_state(cls, state: dict, pacing: Pacing = None, agents: dict = None, deck_rng=None) -> 'GameEngine':
+        """Returns game continuing from table_state(), deck_rng replaces the saved deck rng."""
+        players = [Player(seat['stack'], seat['name']) for seat in state['players']]
+        deck = Deck(start_card=state['start_card'], shuffle=False, rng=deck_rng)
+        deck.set_order(state['deck'])
+        if deck_rng is None and state['rng'] is not None:
+            version, internal, gauss = state['rng']
+            deck.get_rng().setstate((version, tuple(internal), gauss))
+        game = cls(players, deck=deck, small_blind=state['small_blind'], big_blind=state['big_blind'],
+                   raise_amount=state['raise_amount'], action_timeout=state['action_timeout'], pacing=pacing,
+                   history_limit=state['history_limit'], agents=agents, seed=state['seed'])
+        game.game_id = state['game_id']
+        game.rounds_played = state['rounds_played']
+        seat = state['big_blind_seat']
+        game.__current_big_blind = players[seat]
+        game.__current_small_blind = players[(seat + 1) % len(players)]
+        return game
+
+    def apply_hand(self, events: List[dict]) -> None:
+        """
+        Moves chips of a finished hand given by its events (see _record) without playing it.
+        The deck is shuffled once like play_hand does, so seeded decks stay in step.
+        """
+        self.__deck_.reset_deck(shuffle=True)
+        players = {player.get_player_name(): player for player in self.__players_}
+        for event in events:
+            if event['action'] in PAID_ACTIONS:
+                players[event['seat']].take_money(event['amount'])
+            elif event['action'] == 'win':
+                players[event['seat']].add_money(event['amount'])
+        self.rounds_played += 1
+        self._state_changed()
+
+    @property
+    def message(self) -> str:
+        return self.__message
+
+    @message.setter
+    def message(self, value: str) -> None:
+        self.__message = value
+        self._state_changed()
+        self.events.append((self.state_version, value))
+
+    @property
+    def waiting_for(self):
+        return self.__waiting_for
+
+    @waiting_for.setter
+    def waiting_for(self, value) -> None:
+        self.__waiting_for = value
+        self._state_changed()
+
+    def drain_events(self) -> list:
+        """Returns messages posted since the last call, never waits."""
+        events = []
+        while self.events:
+            events.append(self.events.popleft())
+        return events
+
+    def _log(self, *args, **kwargs) -> None:
+        """Prints to the terminal unless the game runs headless."""
+        if not self.pacing.headless:
+            print(*args, **kwargs)
+
+    def subscribe(self, callback) -> None:
+        """Calls callback(state_version) from the game thread every time the game state changes."""
+        self.__subscribers.append(callback)
+
+    def unsubscribe(self, callback) -> None:
+        if callback in self.__subscribers:
+            self.__subscribers.remove(callback)
+
+    def _state_changed(self) -> None:
+        self.state_version += 1
+        for callback in self.__subscribers:
+            callback(self.state_version)
+
+    def submit_choice(self, player_name: str, choice: str) -> None:
+        """Passes choice of the player to the game, called from network threads."""
+        self.actions.submit(player_name, choice)
+
+    def get_players(self) -> List[Player]:
+        return self.__players_
+
+    def _log_decision(self, player: Player, kind: str, choice) -> None:
+        if self.decision_log is not None:
+            self.decision_log({'seat': player.get_player_name(), 'kind': kind, 'choice': choice})
+
+    def agent_of(self, player: Player) -> Agent:
+        """Returns agent deciding for the player, human players get one reading the action channel."""
+        agent = self.agents.get(player.get_player_name())
+        if agent is None:
+            agent = ChannelAgent(self.actions, player.get_player_name(), timeout=self.action_timeout)
+        return agent
+
+    def player_view(self, player: Player) -> dict:
+        """Returns what the player knows when asked for a choice."""
+        state = self.__players_states[player]
+        return {
+            'name': player.get_player_name(),
+            'hand': list(player.get_player_hand()),
+            'stack': player.get_stack_amount(),
+            'bet': state['bet'],
+            'to_call': self.__current_bet - state['bet'],
+            'current_bet': self.__current_bet,
+            'pot': self.__pot,
+            'raise_amount': self.__raise_amount,
+            'allowed_actions': list(self.allowed_actions),
+            'active_players': sum(not s['folded'] for s in self.__players_states.values()),
+        }
 
-    def online_game_state(self, for_player) -> dict:
-        """Returns game state for online game."""
+    def online_game_state(self, for_player: str = None) -> dict:
+        """Returns game state for online game, only hand of for_player (player name) is visible."""
 
         game_state = {
+            'version': self.state_version,
             'pot': self.__pot,
             'current_bet': self.__current_bet,
             'waiting_for': self.waiting_for,
-            'available_actions': self.allowed_actions, # 'fold', 'call', 'raise', 'check', 'all_in' when propmting player action
+            'available_actions': list(self.allowed_actions), # 'fold', 'call', 'raise', 'check', 'all_in' when propmting player action
             'players_info': [],
             'message': self.message,
         }
@@ -206,7 +472,7 @@ class GameEngine:
             player_info = {
                 'name': player.get_player_name(),
                 'stack': player.get_stack_amount(),
-                'hand': player.cards_str_line(),
+                'hand': player.cards_str_line() if player.get_player_name() == for_player else '',
                 'bet': self.__players_states[player]['bet'],
                 'folded': self.__players_states[player]['folded'],
                 'all_in': self.__players_states[player]['all_in'],
@@ -217,27 +483,63 @@ class GameEngine:
         
         return game_state
 
-    def save_game_logs(self):
-        """Saves game logs to file."""
-        date_now_str = pd.Timestamp.now().strftime('%Y-%m-%d_%H-%M-%S')
-        with open(f'game_logs_{date_now_str}.csv', 'w') as f:
-            for i in range(len(self.history)):
-                for action in self.history[i]:
-                    action = action.replace(f'{self.__blue}', '')
-                    action = action.replace(f'{self.__red}', '')
-                    action = action.replace(f'{self.__purple}', '')
-                    action = action.replace(f'{self.__clear}', '')
-                    action = action.replace('\033[0;30m', '')
-                    action = action.replace(',', '')
-
-                    f.write(f'{i},{action}\n')
-        print(f'Game logs saved to game_logs_{date_now_str}.csv')
-        f.close()
-        
+    def play_round(self, history=None, journal=None) -> None:
+        """
+        Plays hands until blinds can't be posted. Every hand is written to history
+        (history.HistoryWriter) as soon as it ends, by default to game_logs_*.csv files,
+        and to journal (snapshot.TableStore) when given.
+        """
+        from history import HistoryWriter
+        from session import Session
+
+        writer = history if history is not None else HistoryWriter(prefix='game_logs', fmt='csv')
+
+        def sink(result: dict) -> None:
+            writer.write(result)
+            if journal is not None:
+                journal.write(result)
 
-    def play_round(self) -> None:
+        try:
+            for _ in Session(self, sink=sink):
+                pass
+        finally:
+            writer.flush()
+            if history is None:
+                writer.close()
+        self._log(f'Game logs saved to {", ".join(writer.paths)}')
+        self._log('Game ended')
+
+    def _record(self, player: Player, action: str, amount: int = 0, cards: list = (), detail: str = '',
+                raise_amount: int = 0, start_card: int = 0) -> None:
+        """Adds structured event to the events of the current hand, actions are listed in history.py."""
+        self.hand_events.append({
+            'game': self.game_id,
+            'hand': self.rounds_played + 1,
+            'seq': len(self.hand_events),
+            'seat': player.get_player_name(),
+            'action': action,
+            'amount': amount,
+            'bet': self.__players_states[player]['bet'],
+            'pot': self.__pot,
+            'cards': [card.get_code() for card in cards],
+            'detail': detail,
+            'raise_amount': raise_amount,
+            'start_card': start_card,
+        })
+
+    def can_post_blinds(self) -> bool:
+        return (self.__current_big_blind.get_stack_amount() >= self.__big_blind
+                and self.__current_small_blind.get_stack_amount() >= self.__small_blind)
+
+    def rotate_blinds(self) -> None:
+        """Moves both blinds one seat forward."""
+        seat = self.__players_.index(self.__current_big_blind)
+        self.__current_big_blind = self.__players_[(seat + 1) % len(self.__players_)]
+        self.__current_small_blind = self.__players_[(seat + 2) % len(self.__players_)]
+
+    def play_hand(self) -> dict:
         """
-        Handles the game round.
+        Plays one hand and returns its result.
         1. Collects blinds
         2. Deals cards
         3. Betting round
@@ -246,6 +548,7 @@ class GameEngine:
         """
         self.__deck_.reset_deck(shuffle=True)
         self.round_history = []
+        self.hand_events = []
         self.__pot = 0
         self.__current_bet = 0
 
@@ -255,44 +558,51 @@ class GameEngine:
             self.__players_states[player]['all_in'] = False
             self.__players_states[player]['checked'] = False
             player.clear_hand()
+            # Stacks and settings the hand starts with, lets replay.py play it again from the history
+            self._record(player, 'stack', player.get_stack_amount(),
+                         raise_amount=self.__raise_amount, start_card=self.__deck_.get_start_card())
         
         self.message = 'The game of Poker will begin shortly...'
-        time.sleep(3)
+        self.pacing.pause('intro')
 
         self.message = 'Game started! (The messages will appear with a delay to provide better user experience)'
-        time.sleep(1)
+        self.pacing.pause('started')
 
         self.message = 'Taking blinds...'
-        time.sleep(2)
+        self.pacing.pause('blinds')
 
         # Collecting blinds
         if self.__current_big_blind.get_stack_amount() < self.__big_blind:
             self.message = 'Player doesn\'t have enough funds for big blind, game will end'
-            time.sleep(2)
+            self.pacing.pause('no_funds')
             raise ValueError("Not enough funds for big blind")
         self.__pot += self.__big_blind
         self.__current_big_blind.take_money(self.__big_blind)
         self.__players_states[self.__current_big_blind]['bet'] = self.__big_blind
+        self._record(self.__current_big_blind, 'big_blind', self.__big_blind)
 
 
         if self.__current_small_blind.get_stack_amount() < self.__small_blind:
             self.message = 'Player doesn\'t have enough funds for small blind, game will end'
-            time.sleep(2)
+            self.pacing.pause('no_funds')
             raise ValueError("Not enough funds for small blind")
         self.__pot += self.__small_blind
         self.__current_small_blind.take_money(self.__small_blind)
         self.__players_states[self.__current_small_blind]['bet'] = self.__small_blind
+        self._record(self.__current_small_blind, 'small_blind', self.__small_blind)
 
         self.__current_bet = self.__big_blind
 
         self.print_table_info()
 
         self.message = 'Dealing cards...'
-        time.sleep(2)
+        self.pacing.pause('dealing')
         # Dealing cards
         self.__deck_.deal(self.__players_)
         for player in self.__players_:
             self._sort_cards(player)
+            self._record(player, 'deal', cards=player.get_player_hand())
+        self._state_changed()
 
         active = 0
         while True:
@@ -333,18 +643,18 @@ class GameEngine:
         # Exchange cards
         if active != 1:
             self.message = 'Prepare for cards exchange! (Separate window will open shortly, it might be hidden behind the game window)'
-            time.sleep(1)
+            self.pacing.pause('prepare_exchange')
             self.exchange_cards()
         
         self.message = 'Cards exchanged!'
-        time.sleep(4)
+        self.pacing.pause('exchanged')
 
         for player in self.__players_:
             if self.__players_states[player]['checked']:
                 self.__players_states[player]['checked'] = False
 
         self.message = 'Starting round 2 of betting...'
-        time.sleep(5)
+        self.pacing.pause('round_two')
         # Round 2
         active = 0
         while True:
@@ -385,180 +695,164 @@ class GameEngine:
         # Showdown
         self.clear_view()
         self.print_table_info()
-        winner = self._showdown()
-        hand_name, _ = self._calculate_hand_strength(winner.get_player_hand())
-        text = f"{self.__purple}{winner.get_player_name()}{self.__clear} wins with {winner.print_hand()} ({hand_name}) bet = {self.__players_states[winner]['bet']}. Pot: {self.__pot}"
-        print(text)
-        
+        winners = self._showdown()
+        hand_name, _ = self._calculate_hand_strength(winners[0].get_player_hand())
+        shares = self._split_pot(winners)
+        active = [player for player in self.__players_ if not self.__players_states[player]['folded']]
+        if len(active) > 1:
+            for player in active:
+                self._record(player, 'show', cards=player.get_player_hand(),
+                             detail=self._calculate_hand_strength(player.get_player_hand())[0])
+        for winner, share in zip(winners, shares):
+            self._record(winner, 'win', share, cards=winner.get_player_hand(), detail=hand_name)
+            text = f"{self.__purple}{winner.get_player_name()}{self.__clear} wins with {winner.print_hand()} ({hand_name}) bet = {self.__players_states[winner]['bet']}. Pot: {self.__pot}, share: {share}"
+            self._log(text)
+            self.round_history.append(text)
+
         self.message = 'Calculating winner...'
-        time.sleep(3)
+        self.pacing.pause('calculating')
 
-        self.message = f'{winner.get_player_name()} wins with {hand_name} ({winner.cards_chat()}) and takes the pot of {self.__pot}!'
-        time.sleep(3)
+        if len(winners) == 1:
+            self.message = f'{winners[0].get_player_name()} wins with {hand_name} ({winners[0].cards_chat()}) and takes the pot of {self.__pot}!'
+        else:
+            names = ', '.join(winner.get_player_name() for winner in winners)
+            self.message = f'Draw! {names} split the pot of {self.__pot} with {hand_name}!'
+        self.pacing.pause('result')
 
         self.message = 'Next round will begin shortly...'
-        time.sleep(5)
-
+        self.pacing.pause('next_round')
 
-        winner.add_money(self.__pot)
-        self.round_history.append(text)
-        print(f'Other players:')
+        for winner, share in zip(winners, shares):
+            winner.add_money(share)
+        self._state_changed()
+        self._log(f'Other players:')
         for player in self.__players_:
-            if player == winner:
+            if player in winners or self.pacing.headless:
                 continue
-            hand_name, _ = self._calculate_hand_strength(player.get_player_hand())
+            other_hand_name, _ = self._calculate_hand_strength(player.get_player_hand())
             if self.__players_states[player]["folded"]:
                 folded = 'folded'
             else:
                 folded = ''
-            print(f'{player.get_player_name()} with {player.print_hand()} ({hand_name}) bet = {self.__players_states[player]["bet"]}, {folded}')
-        #TODO: Devide pot in case of draw
+            self._log(f'{player.get_player_name()} with {player.print_hand()} ({other_hand_name}) bet = {self.__players_states[player]["bet"]}, {folded}')
 
         self.history.append(self.round_history)
+        self.rounds_played += 1
 
-        print('Play next round? (y/n) [n]')
-        input_ = 'y' #TODO: add input
-
-        if input_.lower() == 'y':
-            self.play_round()
-        else:
-            self.save_game_logs()
-            print('Game ended')
-            return
+        return {
+            'round': self.rounds_played,
+            'winners': [winner.get_player_name() for winner in winners],
+            'shares': shares,
+            'pot': self.__pot,
+            'hand': hand_name,
+            'stacks': {player.get_player_name(): player.get_stack_amount() for player in self.__players_},
+            'history': self.round_history,
+            'events': self.hand_events,
+        }
 
     def clear_view(self):
         """Clears view."""
+        if self.pacing.headless:
+            return
         for i in range(100):
-            print()
+            self._log()
 
     def print_table_info(self, confidential: bool = False):
-        print(f'Pot: {self.__purple}{self.__pot}{self.__clear}')
-        print(f'Current bet: {self.__purple}{self.__current_bet}{self.__clear}')
+        if self.pacing.headless:
+            return
+        self._log(f'Pot: {self.__purple}{self.__pot}{self.__clear}')
+        self._log(f'Current bet: {self.__purple}{self.__current_bet}{self.__clear}')
 
         if len(self.round_history) > 0:
-            print(f'{self.__blue}Round history:{self.__clear}')
+            self._log(f'{self.__blue}Round history:{self.__clear}')
             for action in self.round_history:
                 if 'CONFIDENTIAL' in action and not confidential:
                     continue
-                print(f'{self.__blue}{action}{self.__clear}')
+                self._log(f'{self.__blue}{action}{self.__clear}')
     
-    def prompt_bet(self, player: Player, wrong_choice: bool = False) -> tuple:
-        """Gets player action call/raise/check/all_in."""
+    def prompt_bet(self, player: Player) -> str:
+        """Asks agent of the player for action, returns fold/call/raise/check/all_in."""
         self.clear_view()
         self.print_table_info()
-        if wrong_choice:
-            print(f"{self.__red}Wrong choice. Choose again.{self.__clear}")
-        allowed_choices = []
-        print(f'Player: {self.__purple}{player.get_player_name()}{self.__clear}')
-        print(player.cards_to_str())
-        if self.__players_states[player]['bet'] == self.__current_bet:
-            print('You can check or raise')
+        to_call = self.__current_bet - self.__players_states[player]['bet']
+        self._log(f'Player: {self.__purple}{player.get_player_name()}{self.__clear}')
+        if not self.pacing.headless:
+            self._log(player.cards_to_str())
+        if to_call == 0:
+            self._log('You can check or raise')
             if player.get_stack_amount() >= self.__raise_amount:
-                print(f'4. Raise to {self.__current_bet + self.__raise_amount}')
-                allowed_choices.append('4')
-            print('7. Check')
-            allowed_choices.append('7')
+                self._log(f'4. Raise to {self.__current_bet + self.__raise_amount}')
+                self.allowed_actions.append('raise')
+            self._log('7. Check')
+            self.allowed_actions.append('check')
         else:
-            if self.__players_states[player]['bet'] < self.__current_bet:
-                print(f"{self.__red}{player.get_player_name()} must call {self.__current_bet - self.__players_states[player]['bet']}{self.__clear}")
-                print('Choose action:')
-                print('1. Fold')
-                print('2. All in')
-                allowed_choices.append('1')
-                allowed_choices.append('2')
-            if self.__current_bet - self.__players_states[player]["bet"] > player.get_stack_amount():
-                print('3. Call all in')
-                allowed_choices.append('3')
+            self._log(f"{self.__red}{player.get_player_name()} must call {to_call}{self.__clear}")
+            self._log('Choose action:')
+            self._log('1. Fold')
+            self._log('2. All in')
+            self.allowed_actions.append('fold')
+            self.allowed_actions.append('all_in')
+            if to_call > player.get_stack_amount():
+                self._log('3. Call all in')
             else:
-                if self.__current_bet - self.__players_states[player]["bet"] > 0:
-                    print(f'3. Call {self.__current_bet - self.__players_states[player]["bet"]}')
-                    allowed_choices.append('3')
-            if player.get_stack_amount() > self.__raise_amount:
-                print(f'4. Raise to {self.__current_bet + self.__raise_amount}')
-                allowed_choices.append('4')
-            if not self.__players_states[player]['bet'] < self.__current_bet:
-                print('7. Check')
-                allowed_choices.append('7')
-            print('9. Go all in')
-            allowed_choices.append('9')
+                self._log(f'3. Call {to_call}')
+            self.allowed_actions.append('call')
+            if player.get_stack_amount() >= to_call + self.__raise_amount:
+                self._log(f'4. Raise to {self.__current_bet + self.__raise_amount}')
+                self.allowed_actions.append('raise')
 
         self.message_for_player_action = f'Action of {self.__purple}{player.get_player_name()}{self.__clear}'
-
         self.is_waiting_for_action = True
         self.action_type_required = 'bet'
 
-        for input_ in allowed_choices:
-            if input_ == '1':
-                self.allowed_actions.append('fold')
-            elif input_ == '2':
-                self.allowed_actions.append('all_in')
-            elif input_ == '3':
-                self.allowed_actions.append('call')
-            elif input_ == '4':
-                self.allowed_actions.append('raise')
-            elif input_ == '7':
-                self.allowed_actions.append('check')
-
+        self.actions.clear(player.get_player_name())
         self.waiting_for = player.get_player_name()
 
-        while self.selected_choice is None:
-            print(f'Waiting for action from {self.__purple}{player.get_player_name()}{self.__clear}... Available actions: {allowed_choices}, chosen: {self.selected_choice}')
-            self.message = f'Waiting for action from {player.get_player_name()}...'
-
-        selected = str(self.selected_choice).lower().strip()
-
-        if selected == 'fold':
-            selected = '1'
-        
-        if selected == 'call':
-            selected = '3'
-        
-        if selected == 'raise':
-            selected = '4'
-        
-        if selected == 'check':
-            selected = '7'
-
-        if selected == 'all':
-            selected = '9'
+        self._log(f'Waiting for action from {self.__purple}{player.get_player_name()}{self.__clear}... Available actions: {self.allowed_actions}')
+        self.message = f'Waiting for action from {player.get_player_name()}...'
+        selected = ask(self.agent_of(player), 'decide_bet', self.player_view(player))
+        if selected not in self.allowed_actions:
+            # No answer in time or not allowed action, check if possible, otherwise fold
+            self._log(f'{player.get_player_name()} made no valid choice')
+            self.round_history.append(f'{player.get_player_name()} made no valid choice')
+            selected = 'check' if 'check' in self.allowed_actions else 'fold'
 
-        self.input = None
         self.is_waiting_for_action = False
         self.action_type_required = None
         self.message_for_player_action = None
-        self.allowed_actions = [] # 'fold', 'call', 'raise', 'check', 'all_in' when prompting player action
+        self.allowed_actions = [] # 'fold', 'call', 'raise', 'check', 'all_in' when propmting player action
 
-        self.selected_choice = None
         self.waiting_for = None
-        
+
         return selected
 
-    def _apply_bet(self, player: Player, input_: str = '') -> str:
+    def _apply_bet(self, player: Player, action: str) -> str:
+        self._log_decision(player, 'bet', action)
         added = 0
-        return_string = ''
-        if input_ == '1':
-            return_string = 'fold'
+        stack_before = player.get_stack_amount()
+        if action == 'call' and self.__current_bet - self.__players_states[player]['bet'] > player.get_stack_amount():
+            action = 'all_in' # Call all in
+
+        if action == 'fold':
             self.__players_states[player]['folded'] = True
             self.round_history.append(f'{player.get_player_name()} folded, bet = {self.__players_states[player]["bet"]}, pot = {self.__pot}')
             self.message = f'{player.get_player_name()} folded. Their bet was {self.__players_states[player]["bet"]}'
 
-        elif input_ == '3':
-            return_string = 'call'
+        elif action == 'call':
             added = self.__current_bet - self.__players_states[player]['bet']
             self.__players_states[player]['bet'] += added
             self.__players_states[player]['checked'] = True
             self.round_history.append(f'{player.get_player_name()} called {added}, bet = {self.__players_states[player]["bet"]}, pot = {self.__pot}')
             self.message = f'{player.get_player_name()} called. Their bet is now {self.__players_states[player]["bet"]}'
-            
-        elif input_ == '4':
-            return_string = 'raise'
+
+        elif action == 'raise':
             added = self.__current_bet - self.__players_states[player]['bet'] + self.__raise_amount
             self.__players_states[player]['bet'] += added
             self.__current_bet = self.__players_states[player]['bet']
             self.round_history.append(f'{player.get_player_name()} raised {added}, bet = {self.__players_states[player]["bet"]}, pot = {self.__pot}')
             self.message = f'{player.get_player_name()} raised. Their bet is now {self.__players_states[player]["bet"]}'
-        elif input_ == '9' or input_ == '2':
-            return_string = 'all_in'
+
+        elif action == 'all_in':
             self.__players_states[player]['all_in'] = True
             previous_bet = self.__players_states[player]['bet']
             self.__players_states[player]['bet'] = self.__players_states[player]['bet'] + player.get_stack_amount()
@@ -571,72 +865,74 @@ class GameEngine:
             self.round_history.append(f'{player.get_player_name()} went all in {self.__players_states[player]["bet"]}, bet = {self.__players_states[player]["bet"]}, pot = {self.__pot}')
             self.message = f'{player.get_player_name()} went all in. Their bet is now {self.__players_states[player]["bet"]}'
 
-        elif input_ == '7':
-            return_string = 'check'
+        elif action == 'check':
             self.__players_states[player]['checked'] = True
             self.round_history.append(f'{player.get_player_name()} checked, bet = {self.__players_states[player]["bet"]}, pot = {self.__pot}')
             self.message = f'{player.get_player_name()} checked. Their bet is {self.__players_states[player]["bet"]}'
-            
-        time.sleep(0.5) # Simulate some delay for better user experience
-        
+
+        self.pacing.pause('action')
+
         player.take_money(added)
         self.__pot += added
+        self._record(player, action, stack_before - player.get_stack_amount())
+        self._state_changed()
+
+        return action
 
-        return return_string
-    
     def _sort_cards(self, player: Player) -> None:
         """Sorts player cards."""
         player.get_player_hand().sort(key=lambda x: x.get_value()[0], reverse=True)
-    
+
     def get_indecies(self, player: Player, redemption_chances: int = 3) -> List[int]:
-        """Returns list of cards to exchange."""
-        indecies = []
+        """Asks agent of the player which cards to exchange, returns their indecies."""
         self.clear_view()
-        print(f'Action of {self.__purple}{player.get_player_name()}{self.__clear}')
-        print(player.cards_to_str())
-        print('Select cards to exchange (1-5) or nothing to skip(like: 1 2 4):')
-        
+        self._log(f'Action of {self.__purple}{player.get_player_name()}{self.__clear}')
+        if not self.pacing.headless:
+            self._log(player.cards_to_str())
+        self._log('Select cards to exchange (1-5) or nothing to skip(like: 1 2 4):')
+
         self.message_for_player_action = f'Action of {self.__purple}{player.get_player_name()}{self.__clear}'
         self.is_waiting_for_action = True
         self.action_type_required = 'exchange_cards'
         self.allowed_actions = ['1', '2', '3', '4', '5', '9']  # 9 is for skip exchange
-        self.selected_choice = None
+        self.actions.clear(player.get_player_name())
 
         self.waiting_for = player.get_player_name()
-        while self.selected_choice is None:
-            print(f'Waiting for action from {self.__purple}{player.get_player_name()}{self.__clear}...')
-        input_ = self.selected_choice
+        self._log(f'Waiting for action from {self.__purple}{player.get_player_name()}{self.__clear}...')
+        agent = self.agent_of(player)
+        indecies = []
+        for chance in range(redemption_chances + 1):
+            indecies = ask(agent, 'decide_discard', self.player_view(player))
+            if indecies is not None and all(0 <= i < 5 for i in indecies):
+                indecies = sorted(set(indecies))
+                break
+            self._log(f"Wrong indecies: {indecies}")
+            indecies = []
+        else:
+            self._log("Too many errors. No cards exchanged.")
 
         self.is_waiting_for_action = False
         self.action_type_required = None
         self.message_for_player_action = None
         self.allowed_actions = []  # Reset allowed actions after getting input
-        self.selected_choice = None
         self.waiting_for = None
-
-        for i in input_.split():
-            try:
-                if int(i) < 1 or int(i) > 5:
-                    raise ValueError()
-                indecies.append(int(i) - 1)
-            except ValueError:
-                print(f"Wrong index: {i}")
-                if redemption_chances == 0:
-                    print("Too many errors. No cards exchanged.")
-                    return []
-                return self.get_indecies(player, redemption_chances=redemption_chances - 1)
         return indecies
-    
+
+    def suggest_discard(self, player: Player) -> List[int]:
+        """Returns indecies of cards the player should exchange (EV-optimal, see discard_solver)."""
+        from discard_solver import solve_discard
+
+        return solve_discard(player.get_player_hand(), start_card=self.__deck_.get_start_card())['discard']
+
     def exchange_cards(self):
         """Exchange cards, puts exchanged cards into deck."""
         for player in self.__players_:
             if self.__players_states[player]['folded']:
                 continue
             indecies = self.get_indecies(player)
+            self._log_decision(player, 'discard', indecies)
             if len(indecies) == 0:
                 continue
-            if indecies[0] == 9:
-                continue
             cards = []
             for i in indecies:
                 cards.append(player.get_player_hand()[i])
@@ -660,159 +956,39 @@ class GameEngine:
             self.__deck_.collect_cards(cards)
 
             self.__deck_.fill_hands([player])
+            self._record(player, 'discard', len(cards), cards=cards)
+            self._record(player, 'draw', len(cards), cards=player.get_player_hand()[len(kept_cards):])
             current_cards = ''
             for card in player.get_player_hand():
                 current_cards += str(card) + ' '
             self.round_history.append(f'CONFIDENTIAL: {player.get_player_name()} exchanged from hand {previous_cards}: {cards_put_back_str}for {current_cards}')
             self._sort_cards(player)
+            self._state_changed()
     
-    def _showdown(self) -> Player:
-        """Compare hands and find winner."""
-        best_hand = 0
-        winner = self.__players_[0]
+    def _showdown(self) -> List[Player]:
+        """Compare hands and find winners, more than one winner means a draw."""
+        best_hand = -1
+        winners = []
         for player in self.__players_:
             if self.__players_states[player]['folded']:
                 continue
-            _, hand_strength = self._calculate_hand_strength(player.get_player_hand())
+            hand_strength = evaluate(player.get_player_hand())
             if hand_strength > best_hand:
                 best_hand = hand_strength
-                winner = player
-        return winner
+                winners = [player]
+            elif hand_strength == best_hand:
+                winners.append(player)
+        return winners
+
+    def _split_pot(self, winners: List[Player]) -> List[int]:
+        """Splits pot between winners, odd chips go to the first winners in seat order."""
+        share, remainder = divmod(self.__pot, len(winners))
+        return [share + 1 if i < remainder else share for i in range(len(winners))]
 
     def _calculate_hand_strength(self, hand: list = []) -> tuple:
-        """Calculates hand strenght."""
-        hand = hand
-        hand.sort(key=lambda x: x.get_value()[0], reverse=True)
-        hand_strength = 0
-        # 1 Royal Flush
-        if self._is_royal_flush(hand):
-            hand_strength = 100
-            name = 'Royal Flush'
-        # 2 Straight Flush
-        elif self._is_straight_flush(hand):
-            hand_strength = 90
-            name = 'Straight Flush'
-        # 3 Four of a Kind
-        elif self._is_four_of_a_kind(hand):
-            hand_strength = 80
-            name = 'Four of a Kind'
-        # 4 Full House
-        elif self._is_full_house(hand):
-            hand_strength = 70
-            name = 'Full House'
-        # 5 Flush
-        elif self._is_flush(hand):
-            hand_strength = 60
-            name = 'Flush'
-        # 6 Straight
-        elif self._is_straight(hand):
-            hand_strength = 50
-            name = 'Straight'
-        # 7 Three of a Kind
-        elif self._is_three_of_a_kind(hand):
-            hand_strength = 40
-            name = 'Three of a Kind'
-        # 8 Two Pair
-        elif self._is_two_pair(hand):
-            hand_strength = 30
-            name = 'Two Pair'
-        # 9 Pair
-        elif self._is_pair(hand):
-            hand_strength = 20
-            name = 'Pair'
-        # 10 High Card
-        if hand_strength == 0:
-            hand_strength = self._is_high_card(hand)
-            name = 'High Card'
-
-        return name, hand_strength
-    
-    def _is_royal_flush(self, hand: List[Card]) -> bool:
-        suit = hand[0].get_value()[1]
-        for card in hand:
-            if card.get_value()[1] != suit:
-                return False
-        if hand[0].get_value()[0] == 14 and hand[1].get_value()[0] == 13 and hand[2].get_value()[0] == 12 and hand[3].get_value()[0] == 11 and hand[4].get_value()[0] == 10:
-            return True
-        return False
-    
-    def _is_straight_flush(self, hand: List[Card]) -> bool:
-        suit = hand[0].get_value()[1]
-        for card in hand:
-            if card.get_value()[1] != suit:
-                return False
-        return self._is_straight(hand)
-    
-    def _is_four_of_a_kind(self, hand: List[Card]) -> bool:
-        ranks = [card.get_value()[0] for card in hand]
-        for rank in ranks:
-            if ranks.count(rank) == 4:
-                return True
-        return False
-    
-    def _is_full_house(self, hand: List[Card]) -> bool:
-        ranks = [card.get_value()[0] for card in hand]
-        for rank in ranks:
-            if ranks.count(rank) == 3:
-                for rank2 in ranks:
-                    if rank2 != rank and ranks.count(rank2) == 2:
-                        return True
-        return False
-    
-    def _is_flush(self, hand: List[Card]) -> bool:
-        suit = hand[0].get_value()[1]
-        for card in hand:
-            if card.get_value()[1] != suit:
-                return False
-        return True
-    
-    def _is_straight(self, hand: List[Card]) -> bool:
-        current_card_value = hand[0].get_value()[0]
-        if current_card_value == 14 and hand[1].get_value()[0] != 13:
-            # ace in hand
-            current_card_value = hand[1].get_value()[0]
-            hand_zero = hand[0].get_value()
-            hand.remove(hand[0])
-            hand.append(Card(14, hand_zero[1]))
-        for card in hand[1:]:
-            if card.get_value()[0] == (current_card_value - 1):
-                current_card_value -= 1
-            else:
-                if card.get_value()[0] == 14 and current_card_value == 2:
-                    # ace in hand and 2 in hand
-                    continue
-                return False
-        return True
-    
-    def _is_three_of_a_kind(self, hand: List[Card]) -> bool:
-        ranks = [card.get_value()[0] for card in hand]
-        for rank in ranks:
-            if ranks.count(rank) == 3:
-                return True
-        return False
-    
-    def _is_two_pair(self, hand: List[Card]) -> bool:
-        ranks = [card.get_value()[0] for card in hand]
-        pairs = 0
-        for rank in ranks:
-            if ranks.count(rank) == 2:
-                pairs += 1
-                ranks.remove(rank)
-        if pairs == 2:
-            return True
-        return False
-    
-    def _is_pair(self, hand: List[Card]) -> bool:
-        ranks = [card.get_value()[0] for card in hand]
-        for rank in ranks:
-            if ranks.count(rank) == 2:
-                return True
-        return False
-    
-    def _is_high_card(self, hand: List[Card]) -> int:
-        ranks = [card.get_value()[0] for card in hand]
-        ranks.sort(reverse=True)
-        return ranks[0]
+        """Calculates hand strenght, returns hand name and comparable strength."""
+        strength = evaluate(hand)
+        return hand_name(strength), strength
 
 if __name__ == "__main__":
     game = GameEngine([Player(100, 'Satori'), Player(100, 'Koishi')], start_card=7)
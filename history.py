@@ -0,0 +1,104 @@
+import csv
+import io
+import json
+import os
+import time
+from typing import List, Optional
+
+# Columns of every event, see GameEngine._record
+EVENT_FIELDS = ('time', 'game', 'hand', 'seq', 'seat', 'action', 'amount', 'bet', 'pot', 'cards', 'detail',
+                'raise_amount', 'start_card')
+# Actions of the events, in the order a hand records them:
+#   stack       - every seat when the hand starts: amount is its stack, raise_amount and start_card
+#                 are the table settings (0 in every other event). Moves no chips, lets replay.py
+#                 play the hand again
+#   big_blind, small_blind, call, raise, all_in - amount is taken from the stack of the seat
+#   deal        - cards dealt to the seat
+#   fold, check - amount is 0
+#   discard, draw - amount is the number of cards, cards are the exchanged cards
+#   show        - cards of the seat at the showdown, detail is the hand name
+#   win         - amount is added to the stack of the seat, detail is the winning hand name
+
+
+class HistoryWriter:
+    """
+    Append-only hand history. Every finished hand is written as one record per event,
+    in JSON Lines ('jsonl') or CSV ('csv'). Records are buffered in memory up to
+    buffer_size bytes, files rotate after max_bytes bytes or max_age seconds.
+    Write the hand results of a Session with Session(game, sink=writer.write).
+    """
+
+    def __init__(self, prefix: str = 'hand_history', fmt: str = 'jsonl', directory: str = '.',
+                 buffer_size: int = 1 << 16, max_bytes: Optional[int] = 64 << 20, max_age: Optional[float] = None):
+        if fmt not in ('jsonl', 'csv'):
+            raise ValueError("fmt must be 'jsonl' or 'csv'")
+        self.prefix = prefix
+        self.fmt = fmt
+        self.directory = directory
+        self.buffer_size = buffer_size
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.paths: List[str] = []
+        self.__file_ = None
+        self.__opened_at_ = 0.0
+        self.__written_ = 0
+        self.__buffer_ = io.StringIO()
+        self.__csv_ = csv.writer(self.__buffer_, lineterminator='\n')
+
+    def __enter__(self) -> 'HistoryWriter':
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def _open(self) -> None:
+        stamp = time.strftime('%Y-%m-%d_%H-%M-%S')
+        path = os.path.join(self.directory, f'{self.prefix}_{stamp}_{len(self.paths) + 1}.{self.fmt}')
+        self.__file_ = open(path, 'w', encoding='utf-8', newline='')
+        self.__opened_at_ = time.time()
+        self.__written_ = 0
+        self.paths.append(path)
+        if self.fmt == 'csv':
+            self.__file_.write(','.join(EVENT_FIELDS) + '\n')
+
+    def _should_rotate(self) -> bool:
+        if self.max_bytes is not None and self.__written_ >= self.max_bytes:
+            return True
+        return self.max_age is not None and time.time() - self.__opened_at_ >= self.max_age
+
+    def write(self, result: dict) -> None:
+        """Buffers events of one hand result (GameEngine.play_hand), flushes when the buffer is full."""
+        now = round(time.time(), 3)
+        if self.fmt == 'jsonl':
+            for event in result['events']:
+                self.__buffer_.write(json.dumps(dict(event, time=now), ensure_ascii=False))
+                self.__buffer_.write('\n')
+        else:
+            for event in result['events']:
+                self.__csv_.writerow([now, event['game'], event['hand'], event['seq'], event['seat'], event['action'], event['amount'],
+                                      event['bet'], event['pot'], ' '.join(event['cards']), event['detail'],
+                                      event['raise_amount'], event['start_card']])
+        if self.__buffer_.tell() >= self.buffer_size or (self.__file_ is not None and self._should_rotate()):
+            self.flush()
+
+    def flush(self) -> None:
+        """Writes buffered records to the current file, then starts a new file if it is due."""
+        data = self.__buffer_.getvalue()
+        if not data:
+            return
+        if self.__file_ is None:
+            self._open()
+        self.__file_.write(data)
+        self.__file_.flush()
+        self.__written_ = self.__file_.tell()
+        self.__buffer_.seek(0)
+        self.__buffer_.truncate()
+        if self._should_rotate():
+            self.__file_.close()
+            self.__file_ = None
+
+    def close(self) -> None:
+        self.flush()
+        if self.__file_ is not None:
+            self.__file_.close()
+            self.__file_ = None
@@ -0,0 +1,287 @@
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
+
+from agents import ChannelAgent, ScriptedAgent
+from game import GameEngine, Player
+from pacing import Pacing
+from wal import TableLog, WriteAheadLog, compact, recover_tables
+
+
+class Table:
+    """One independent game: seats, spectators and the GameEngine playing on it."""
+
+    def __init__(self, table_id: int, max_seats: int = 6, starting_stack: int = 1000, **engine_options):
+        self.table_id = table_id
+        self.max_seats = max_seats
+        self.starting_stack = starting_stack
+        self.engine_options = engine_options
+        self.seats: List[Optional[int]] = [None] * max_seats  # connection id of every seat
+        self.spectators = set()
+        self.game = None
+        self.players = []
+        self.future = None
+        self.log = None # wal.TableLog when the lobby has a write-ahead log
+        self.log_record = 0 # number of the 'table' record, the game waits until it is durable
+        self.recovered = False
+
+    @property
+    def is_active(self) -> bool:
+        return self.future is not None and not self.future.done()
+
+    @property
+    def is_over(self) -> bool:
+        return self.future is not None and self.future.done()
+
+    def seated(self) -> List[int]:
+        return [conn_id for conn_id in self.seats if conn_id is not None]
+
+    def _free_seats(self) -> List[int]:
+        if self.recovered:
+            # Players of a recovered game take their seats back when they reconnect
+            names = {player.get_player_name() for player in self.players}
+            return [i for i, conn_id in enumerate(self.seats) if conn_id is None and f'Player{i + 1}' in names]
+        if self.game is not None:
+            return []
+        return [i for i, conn_id in enumerate(self.seats) if conn_id is None]
+
+    def has_free_seat(self) -> bool:
+        return bool(self._free_seats())
+
+    def seat_name(self, conn_id: int) -> Optional[str]:
+        """Returns player name of the connection, None for spectators."""
+        if conn_id not in self.seats:
+            return None
+        return "Player" + str(self.seats.index(conn_id) + 1)
+
+    def sit(self, conn_id: int) -> int:
+        """Seats connection at first free seat, returns seat number (1-based)."""
+        free = self._free_seats()
+        if not free:
+            raise ValueError("table is full or already playing")
+        seat = free[0]
+        self.seats[seat] = conn_id
+        return seat + 1
+
+    def leave(self, conn_id: int) -> None:
+        self.spectators.discard(conn_id)
+        # Seats of a running game stay taken, the player times out on every action
+        if self.game is None and conn_id in self.seats:
+            self.seats[self.seats.index(conn_id)] = None
+
+    def start(self, executor: ThreadPoolExecutor, wal: WriteAheadLog = None):
+        """Creates the GameEngine and schedules it on the shared worker pool."""
+        if self.game is not None:
+            raise ValueError("game already started")
+        if len(self.seated()) < 2:
+            raise ValueError("not enough players")
+        self.players = [Player(self.starting_stack, self.seat_name(conn_id)) for conn_id in self.seated()]
+        self.game = GameEngine(self.players, **self.engine_options)
+        if wal is not None:
+            self.log = TableLog(wal, self.table_id, self.game)
+            # Called on the event loop, the fsync is waited for on the game thread
+            self.log_record = wal.append({'type': 'table', 'table': self.table_id, 'max_seats': self.max_seats,
+                                          'starting_stack': self.starting_stack, 'state': self.game.table_state()},
+                                         wait=False)
+        self.future = executor.submit(self._play)
+        self.future.add_done_callback(self._finished)
+        return self.future
+
+    def resume(self, executor: ThreadPoolExecutor, wal: WriteAheadLog, state: dict, decisions: List[dict]):
+        """
+        Rebuilds the game of a recovered table (see wal.recover_tables): restores its last
+        logged state, replays the decisions made since headlessly, then plays on.
+        """
+        live_pacing = self.engine_options.get('pacing') or Pacing()
+        self.game = GameEngine.from_table_state(state, pacing=Pacing.headless_mode() if decisions else live_pacing)
+        self.players = self.game.get_players()
+        self.recovered = True
+        for player in self.players:
+            name = player.get_player_name()
+            bets = [d['choice'] for d in decisions if d['seat'] == name and d['kind'] == 'bet']
+            discards = [d['choice'] for d in decisions if d['seat'] == name and d['kind'] == 'discard']
+            self.game.agents[name] = ScriptedAgent(bets, discards, then=ChannelAgent(
+                self.game.actions, name, timeout=self.game.action_timeout))
+        self.log = TableLog(wal, self.table_id, self.game, replaying=len(decisions), pacing=live_pacing)
+        self.future = executor.submit(self._play)
+        self.future.add_done_callback(self._finished)
+        return self.future
+
+    def _play(self) -> None:
+        if self.log is None:
+            self.game.play_round()
+            return
+        self.log.wal.wait(self.log_record)
+        try:
+            self.game.play_round(journal=self.log)
+        except Exception as e:
+            # Recovering a crashed game would crash it again on every restart. A closed
+            # log means the server is stopping, the table is recovered after the restart.
+            if not self.log.wal.closed:
+                self.log.failed(e)
+            raise
+        self.log.end()
+
+    def _finished(self, future) -> None:
+        if not future.cancelled() and future.exception() is not None:
+            print(f"Game at table {self.table_id} crashed: {future.exception()!r}")
+
+    def submit_choice(self, conn_id: int, choice: str) -> None:
+        """Routes choice of the connection to the game of this table."""
+        name = self.seat_name(conn_id)
+        if self.game is None or name is None:
+            raise ValueError("not playing at this table")
+        self.game.submit_choice(name, choice)
+
+    def game_state(self, conn_id: int) -> dict:
+        if self.game is None:
+            return {'title': 'game_state', 'error': "Game not started yet.", 'table_id': self.table_id}
+        name = self.seat_name(conn_id)
+        game_state = self.game.online_game_state(for_player=name)
+        game_state['title'] = 'game_state'
+        game_state['table_id'] = self.table_id
+        game_state['destined_for'] = name
+        game_state['spectator'] = name is None
+        return game_state
+
+    def game_states(self, conn_ids: List[int]) -> Dict[int, dict]:
+        """
+        Returns game state for every connection. Public state is built once,
+        then every seat gets a copy with only its own hand filled in.
+        """
+        if self.game is None:
+            return {conn_id: self.game_state(conn_id) for conn_id in conn_ids}
+        public = self.game.online_game_state(for_player=None)
+        public['title'] = 'game_state'
+        public['table_id'] = self.table_id
+        states = {}
+        for conn_id in conn_ids:
+            name = self.seat_name(conn_id)
+            game_state = dict(public, destined_for=name, spectator=name is None)
+            if name is not None:
+                players_info = list(public['players_info'])
+                for i, player in enumerate(self.players):
+                    if player.get_player_name() == name:
+                        players_info[i] = dict(players_info[i], hand=player.cards_str_line())
+                game_state['players_info'] = players_info
+            states[conn_id] = game_state
+        return states
+
+    def info(self) -> dict:
+        return {
+            'table_id': self.table_id,
+            'players': len(self.seated()),
+            'max_seats': self.max_seats,
+            'spectators': len(self.spectators),
+            'active': self.is_active,
+        }
+
+
+class Lobby:
+    """
+    Hosts many tables in one process, tables are played on a shared worker pool. Every game
+    holds its worker until it ends, so there are never more open tables than workers.
+    """
+
+    def __init__(self, max_workers: int = 32, max_seats: int = 6, wal_path: str = None, **engine_options):
+        self.max_tables = max_workers
+        self.max_seats = max_seats
+        self.engine_options = engine_options
+        self.tables: Dict[int, Table] = {}
+        self.connections: Dict[int, Table] = {}
+        self.next_table_id = 1
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='table')
+        self.wal_path = wal_path
+        self.wal = None
+
+    def recover(self) -> List[Table]:
+        """
+        Rebuilds tables whose games were running when the server stopped, from the
+        write-ahead log, then keeps logging to it. Returns the recovered tables.
+        """
+        if self.wal_path is None:
+            return []
+        recovered = recover_tables(self.wal_path)
+        compact(self.wal_path, recovered)
+        self.wal = WriteAheadLog(self.wal_path)
+        tables = []
+        for table_id, record in recovered.items():
+            self.next_table_id = max(self.next_table_id, table_id + 1)
+            if len(tables) >= self.max_tables:
+                # Still in the log, they are recovered after a restart with more workers
+                print(f"No free worker for recovered table {table_id}, it is left in the write-ahead log")
+                continue
+            table = Table(table_id, max_seats=record['max_seats'], starting_stack=record['starting_stack'],
+                          **self.engine_options)
+            self.tables[table_id] = table
+            table.resume(self.executor, self.wal, record['state'], record['decisions'])
+            tables.append(table)
+        return tables
+
+    def open_tables(self) -> int:
+        """Returns number of tables whose game is waiting for players or running."""
+        return sum(1 for table in self.tables.values() if not table.is_over)
+
+    def create_table(self, **engine_options) -> Table:
+        if self.open_tables() >= self.max_tables:
+            raise ValueError(f"server is full, all {self.max_tables} tables are open")
+        options = dict(self.engine_options, **engine_options)
+        table = Table(self.next_table_id, max_seats=self.max_seats, **options)
+        self.tables[table.table_id] = table
+        self.next_table_id += 1
+        return table
+
+    def join(self, conn_id: int, table_id: int = None) -> Table:
+        """Seats connection at given table or the first table that is still waiting for players."""
+        self.leave(conn_id)
+        if table_id is not None:
+            table = self.get_table(table_id)
+        else:
+            table = next((table for table in self.tables.values() if table.has_free_seat()), None)
+            if table is None:
+                table = self.create_table()
+        table.sit(conn_id)
+        self.connections[conn_id] = table
+        return table
+
+    def spectate(self, conn_id: int, table_id: int) -> Table:
+        table = self.get_table(table_id)
+        self.leave(conn_id)
+        table.spectators.add(conn_id)
+        self.connections[conn_id] = table
+        return table
+
+    def leave(self, conn_id: int) -> None:
+        table = self.connections.pop(conn_id, None)
+        if table is None:
+            return
+        table.leave(conn_id)
+        connected = [other for other in table.seated() if other in self.connections]
+        if not table.is_active and not connected and not table.spectators:
+            del self.tables[table.table_id]
+
+    def get_table(self, table_id: int) -> Table:
+        if table_id not in self.tables:
+            raise ValueError(f"no table {table_id}")
+        return self.tables[table_id]
+
+    def table_of(self, conn_id: int) -> Table:
+        if conn_id not in self.connections:
+            raise ValueError("connection is not at any table")
+        return self.connections[conn_id]
+
+    def start_table(self, conn_id: int):
+        table = self.table_of(conn_id)
+        if table.game is None and sum(1 for other in self.tables.values() if other.is_active) >= self.max_tables:
+            raise ValueError(f"all {self.max_tables} table workers are busy, wait for a game to end")
+        return table.start(self.executor, self.wal)
+
+    def route(self, conn_id: int, choice: str) -> None:
+        self.table_of(conn_id).submit_choice(conn_id, choice)
+
+    def list_tables(self) -> List[dict]:
+        return [table.info() for table in self.tables.values()]
+
+    def shutdown(self) -> None:
+        self.executor.shutdown(wait=False, cancel_futures=True)
+        if self.wal is not None:
+            self.wal.close()
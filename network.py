@@ -1,13 +1,27 @@
 import socket
-import pickle
+import queue
+import threading
+from protocol import apply_delta, decode_message, encode_message, recv_frame, send_frame
 
 class Network:
+    """
+    Connection to the server. The server pushes game state whenever it changes,
+    a background thread receives it so the GUI loop never waits for the network.
+    Deltas are applied here, poll() always returns full game states.
+    """
+
     def __init__(self):
         self.client = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
         self.server = "127.0.0.1"
         self.port = 55557
         self.addr = (self.server, self.port)
+        self.messages = queue.Queue()
+        self.game_state = None
+        # The reader thread asks for a full state while the GUI thread sends actions, frames must not interleave
+        self.send_lock = threading.Lock()
         self.id = self.connect()
+        if self.id is not None:
+            threading.Thread(target=self._read_loop, daemon=True).start()
 
     def get_id(self):
         return self.id
@@ -15,44 +29,60 @@ class Network:
     def connect(self):
         try:
             self.client.connect(self.addr)
-            return self.client.recv(2048).decode("utf-8")
-        except socket.error as e:
+            welcome = decode_message(recv_frame(self.client))
+            if welcome.get('title') != 'welcome':
+                print(f"Connection refused: {welcome.get('error')}")
+                return None
+            return str(welcome['seat'])
+        except (socket.error, TypeError, ValueError) as e:
             print(f"Connection error: {e}")
             return None
-    
-    def send(self, data):
-        try:
-            self.client.send(data.encode("utf-8"))
-            if data == 'start_game':
-                # ignore this response for start_game
-                return self.client.recv(2048)
-            return self.client.recv(2048).decode("utf-8")
-        except socket.error as e:
-            print(f"Send error: {e}")
-            return None
-        
-    def send_pickle(self, data):
+
+    def _read_loop(self):
         try:
-            self.client.send(pickle.dumps(data))
-            return pickle.loads(self.client.recv(2048))
-        except socket.error as e:
-            print(f"Send pickle error: {e}")
-            return None
-        
-    def read_broadcast(self, playerId, start=None, send_action=None, exchange=None):
+            while True:
+                data = recv_frame(self.client)
+                if data is None:
+                    break
+                message = decode_message(data)
+                if message.get('title') == 'game_delta':
+                    try:
+                        message = apply_delta(self.game_state, message)
+                    except ValueError:
+                        # Out of sync, ask for a full state
+                        self.send({'title': 'send_game_state'})
+                        continue
+                if message.get('title') == 'game_state':
+                    self.game_state = message
+                self.messages.put(message)
+        except (socket.error, ValueError) as e:
+            print(f"Read error: {e}")
+        self.messages.put(None)
+
+    def poll(self) -> list:
+        """Returns messages received since the last call, None in the list means the server disconnected."""
+        received = []
+        while True:
+            try:
+                received.append(self.messages.get_nowait())
+            except queue.Empty:
+                return received
+
+    def send(self, message: dict):
         try:
-            if start is not None:
-                self.client.send(f'start_game'.encode("utf-8"))
-            elif send_action is not None:
-                self.client.send(f'action_{playerId}_{send_action}'.encode("utf-8"))
-            elif exchange is not None:
-                self.client.send(f'exchange_{playerId}_{exchange}'.encode("utf-8"))
-            else:
-                self.client.send(f'send_game_state_{playerId}'.encode("utf-8"))
-            data = self.client.recv(2048)
-            if not data:
-                return None
-            return pickle.loads(data)
+            data = encode_message(message)
+            with self.send_lock:
+                send_frame(self.client, data)
+            return True
         except socket.error as e:
-            print(f"Read broadcast error: {e}")
-            return None
+            print(f"Send error: {e}")
+            return False
+
+    def start_game(self):
+        return self.send({'title': 'start_game'})
+
+    def send_action(self, playerId, action):
+        return self.send({'title': 'action', 'choice': action})
+
+    def send_exchange(self, playerId, exchange):
+        return self.send({'title': 'exchange', 'choice': exchange})
@@ -0,0 +1,44 @@
+import time
+
+# Seconds the table waits after each step, so players can read the messages
+DEFAULT_DELAYS = {
+    'intro': 3,
+    'started': 1,
+    'blinds': 2,
+    'no_funds': 2,
+    'dealing': 2,
+    'prepare_exchange': 1,
+    'exchanged': 4,
+    'round_two': 5,
+    'calculating': 3,
+    'result': 3,
+    'next_round': 5,
+    'action': 0.5,
+}
+
+
+class Pacing:
+    """
+    Decides how long the game waits between steps of a round.
+    Headless pacing never waits and keeps the terminal quiet, messages only go to
+    the event stream of the game, so bots and tests play as fast as the engine can.
+    """
+
+    def __init__(self, delays: dict = None, scale: float = 1.0, headless: bool = False):
+        self.delays = dict(DEFAULT_DELAYS, **(delays or {}))
+        self.scale = scale
+        self.headless = headless
+
+    @classmethod
+    def headless_mode(cls) -> 'Pacing':
+        """Returns pacing without any delays or terminal output."""
+        return cls(scale=0.0, headless=True)
+
+    def delay(self, step: str) -> float:
+        """Returns seconds to wait after given step."""
+        return self.delays.get(step, 0) * self.scale
+
+    def pause(self, step: str) -> None:
+        seconds = self.delay(step)
+        if seconds > 0:
+            time.sleep(seconds)
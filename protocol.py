@@ -0,0 +1,336 @@
+import socket
+import struct
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    import asyncio
+
+# Every message is sent as a frame: 4-byte big-endian payload length, then the payload.
+# Messages of any size arrive whole, no matter how TCP splits them.
+FRAME_HEADER = struct.Struct('!I')
+MAX_FRAME_SIZE = 1 << 20
+
+
+def pack_frame(payload: bytes) -> bytes:
+    """Returns payload prefixed with its length."""
+    if len(payload) > MAX_FRAME_SIZE:
+        raise ValueError("frame too large")
+    return FRAME_HEADER.pack(len(payload)) + payload
+
+
+def _recv_exact(sock: socket.socket, size: int):
+    data = bytearray()
+    while len(data) < size:
+        chunk = sock.recv(size - len(data))
+        if not chunk:
+            return None
+        data += chunk
+    return bytes(data)
+
+
+def send_frame(sock: socket.socket, payload: bytes) -> None:
+    sock.sendall(pack_frame(payload))
+
+
+def recv_frame(sock: socket.socket):
+    """Reads one frame from blocking socket, returns None when connection is closed."""
+    header = _recv_exact(sock, FRAME_HEADER.size)
+    if header is None:
+        return None
+    (size,) = FRAME_HEADER.unpack(header)
+    if size > MAX_FRAME_SIZE:
+        raise ValueError("frame too large")
+    return _recv_exact(sock, size)
+
+
+async def read_frame(reader: 'asyncio.StreamReader'):
+    """Reads one frame from asyncio stream, returns None when connection is closed."""
+    try:
+        header = await reader.readexactly(FRAME_HEADER.size)
+        (size,) = FRAME_HEADER.unpack(header)
+        if size > MAX_FRAME_SIZE:
+            raise ValueError("frame too large")
+        return await reader.readexactly(size)
+    except EOFError: # asyncio.IncompleteReadError, asyncio itself is not imported for sync clients
+        return None
+
+
+async def write_frame(writer: 'asyncio.StreamWriter', payload: bytes) -> None:
+    """Writes one frame and waits while the peer is reading too slowly."""
+    writer.write(pack_frame(payload))
+    await writer.drain()
+
+
+# Game state is sent once as a full snapshot ('game_state'), then as deltas
+# ('game_delta') holding only the fields that changed since the previous version.
+def make_delta(previous: dict, current: dict):
+    """
+    Returns delta turning previous state into current one, None if a full snapshot is needed.
+    Delta without 'changes' and 'players' means nothing changed.
+    """
+    if ('version' not in previous or 'version' not in current
+            or previous.get('table_id') != current.get('table_id')
+            or len(previous['players_info']) != len(current['players_info'])):
+        return None
+    changes = {key: value for key, value in current.items()
+               if key != 'players_info' and previous.get(key) != value}
+    changes.pop('version', None)
+    players = {}
+    for i, (old, new) in enumerate(zip(previous['players_info'], current['players_info'])):
+        changed = {key: value for key, value in new.items() if old.get(key) != value}
+        if changed:
+            players[i] = changed
+    delta = {'title': 'game_delta', 'base': previous['version'], 'version': current['version']}
+    if changes:
+        delta['changes'] = changes
+    if players:
+        delta['players'] = players
+    return delta
+
+
+def apply_delta(state: dict, delta: dict) -> dict:
+    """Returns new state with delta applied, raises ValueError when delta is for another version."""
+    if state is None or state.get('version') != delta['base']:
+        raise ValueError("delta does not match current state")
+    new_state = dict(state)
+    new_state.update(delta.get('changes', {}))
+    new_state['version'] = delta['version']
+    players_info = list(state['players_info'])
+    for i, changed in delta.get('players', {}).items():
+        players_info[i] = dict(players_info[i], **changed)
+    new_state['players_info'] = players_info
+    new_state['title'] = 'game_state'
+    return new_state
+
+
+# Messages are dicts with a 'title'. On the wire a message is 1-byte type, 16-bit mask of the
+# fields that are present, then the present fields in schema order. Nothing but these types
+# is ever decoded, so a client cannot make the server run code the way pickle.loads would.
+_U8 = struct.Struct('!B')
+_U16 = struct.Struct('!H')
+_U32 = struct.Struct('!I')
+_I32 = struct.Struct('!i')
+_NONE_STR = 0xFFFF  # length of a missing optional string
+
+# Fixed-width fields go last in every schema, a record that has all of them packs them with one struct
+PLAYER_FIELDS = (
+    ('name', 'str'), ('hand', 'str'), ('stack', 'i32'), ('bet', 'u32'),
+    ('folded', 'bool'), ('all_in', 'bool'), ('checked', 'bool'),
+)
+TABLE_FIELDS = (
+    ('table_id', 'u16'), ('players', 'u8'), ('max_seats', 'u8'), ('spectators', 'u16'), ('active', 'bool'),
+)
+STATE_FIELDS = (
+    ('error', 'str'), ('waiting_for', 'ostr'), ('available_actions', 'strs'), ('message', 'ostr'),
+    ('destined_for', 'ostr'), ('players_info', 'players'),
+    ('table_id', 'u16'), ('version', 'u32'), ('pot', 'u32'), ('current_bet', 'u32'), ('spectator', 'bool'),
+)
+DELTA_FIELDS = (
+    ('base', 'u32'), ('version', 'u32'), ('changes', 'changes'), ('players', 'player_changes'),
+)
+
+MESSAGES = {
+    # server -> client
+    'welcome': (1, (('seat', 'u8'), ('table_id', 'u16'))),
+    'game_state': (2, STATE_FIELDS),
+    'game_delta': (3, DELTA_FIELDS),
+    'is_game_active': (4, (('active', 'bool'),)),  # asked without 'active', answered with it
+    'tables': (5, (('tables', 'tables'),)),
+    'unknown_message': (6, (('error', 'str'),)),
+    # client -> server
+    'action': (16, (('choice', 'str'),)),
+    'exchange': (17, (('choice', 'str'),)),
+    'start_game': (18, ()),
+    'send_game_state': (19, ()),
+    'list_tables': (20, ()),
+    'create_table': (21, ()),
+    'join': (22, (('table_id', 'u16'),)),
+    'spectate': (23, (('table_id', 'u16'),)),
+}
+_FIXED_FORMATS = {'u8': 'B', 'u16': 'H', 'u32': 'I', 'i32': 'i', 'bool': '?'}
+
+
+def _pack_str(value, out: list) -> None:
+    if value is None:
+        out.append(_NONE_STR_BYTES)
+        return
+    data = value.encode('utf-8')
+    if len(data) >= _NONE_STR:
+        raise ValueError("string too long")
+    out.append(_U16.pack(len(data)) + data)
+
+
+def _unpack_str(data: bytes, pos: int):
+    (size,) = _U16.unpack_from(data, pos)
+    pos += 2
+    if size == _NONE_STR:
+        return None, pos
+    end = pos + size
+    if end > len(data):
+        raise ValueError("truncated message")
+    return data[pos:end].decode('utf-8'), end
+
+
+def _number(kind: str):
+    fmt = struct.Struct('!' + _FIXED_FORMATS[kind])
+    pack, unpack_from, size = fmt.pack, fmt.unpack_from, fmt.size
+
+    def pack_value(value, out: list) -> None:
+        out.append(pack(value))
+
+    def unpack_value(data: bytes, pos: int):
+        return unpack_from(data, pos)[0], pos + size
+    return pack_value, unpack_value
+
+
+def _pack_strs(value, out: list) -> None:
+    out.append(_U8.pack(len(value)))
+    for item in value:
+        _pack_str(item, out)
+
+
+def _unpack_strs(data: bytes, pos: int):
+    count = data[pos]
+    pos += 1
+    items = []
+    for _ in range(count):
+        item, pos = _unpack_str(data, pos)
+        items.append(item)
+    return items, pos
+
+
+def _record_list(schema: tuple):
+    def pack_value(value, out: list) -> None:
+        out.append(_U8.pack(len(value)))
+        for record in value:
+            _pack_record(schema, record, out)
+
+    def unpack_value(data: bytes, pos: int):
+        count = data[pos]
+        pos += 1
+        records = []
+        for _ in range(count):
+            record, pos = _unpack_record(schema, data, pos)
+            records.append(record)
+        return records, pos
+    return pack_value, unpack_value
+
+
+def _indexed_records(schema: tuple):
+    def pack_value(value, out: list) -> None:
+        out.append(_U8.pack(len(value)))
+        for index, record in value.items():
+            out.append(_U8.pack(index))
+            _pack_record(schema, record, out)
+
+    def unpack_value(data: bytes, pos: int):
+        count = data[pos]
+        pos += 1
+        records = {}
+        for _ in range(count):
+            index = data[pos]
+            records[index], pos = _unpack_record(schema, data, pos + 1)
+        return records, pos
+    return pack_value, unpack_value
+
+
+def _pack_record(schema: tuple, record: dict, out: list) -> None:
+    fields, head, tail_names, tail_keys, tail, tail_mask = schema
+    mask_at = len(out)
+    out.append(b'')
+    mask = 0
+    if tail is not None and tail_keys <= record.keys():
+        for name, bit, pack_value, _ in head:
+            if name in record:
+                mask |= bit
+                pack_value(record[name], out)
+        out.append(tail.pack(*[record[name] for name in tail_names]))
+        mask |= tail_mask
+    else:
+        for name, bit, pack_value, _ in fields:
+            if name in record:
+                mask |= bit
+                pack_value(record[name], out)
+    out[mask_at] = _U16.pack(mask)
+
+
+def _unpack_record(schema: tuple, data: bytes, pos: int):
+    fields, head, tail_names, tail_keys, tail, tail_mask = schema
+    (mask,) = _U16.unpack_from(data, pos)
+    pos += 2
+    if mask >> len(fields):
+        raise ValueError("unknown fields in message")
+    record = {}
+    if tail is not None and mask & tail_mask == tail_mask:
+        for name, bit, _, unpack_value in head:
+            if mask & bit:
+                record[name], pos = unpack_value(data, pos)
+        record.update(zip(tail_names, tail.unpack_from(data, pos)))
+        return record, pos + tail.size
+    for name, bit, _, unpack_value in fields:
+        if mask & bit:
+            record[name], pos = unpack_value(data, pos)
+    return record, pos
+
+
+def _compile(fields: tuple) -> tuple:
+    """
+    Returns schema as (fields, head, tail names, tail keys, tail struct, tail mask), fields are
+    (name, mask bit, pack, unpack) tuples and tail is the run of fixed-width fields at the end.
+    """
+    if len(fields) > 16:
+        raise ValueError("too many fields for 16-bit mask")
+    compiled = tuple((name, 1 << bit, *_KINDS[kind]) for bit, (name, kind) in enumerate(fields))
+    split = len(fields)
+    while split > 0 and fields[split - 1][1] in _FIXED_FORMATS:
+        split -= 1
+    if len(fields) - split < 2:
+        return compiled, compiled, (), frozenset(), None, 0
+    tail_names = tuple(name for name, _ in fields[split:])
+    tail = struct.Struct('!' + ''.join(_FIXED_FORMATS[kind] for _, kind in fields[split:]))
+    tail_mask = sum(bit for _, bit, _, _ in compiled[split:])
+    return compiled, compiled[:split], tail_names, frozenset(tail_names), tail, tail_mask
+
+
+_NONE_STR_BYTES = _U16.pack(_NONE_STR)
+_KINDS = {kind: _number(kind) for kind in _FIXED_FORMATS}
+_KINDS.update({
+    'str': (_pack_str, _unpack_str), 'ostr': (_pack_str, _unpack_str), 'strs': (_pack_strs, _unpack_strs),
+})
+_KINDS['players'] = _record_list(_compile(PLAYER_FIELDS))
+_KINDS['tables'] = _record_list(_compile(TABLE_FIELDS))
+_KINDS['player_changes'] = _indexed_records(_compile(PLAYER_FIELDS))
+_STATE = _compile(STATE_FIELDS)
+_KINDS['changes'] = (lambda value, out: _pack_record(_STATE, value, out),
+                     lambda data, pos: _unpack_record(_STATE, data, pos))
+_SCHEMAS = {title: (_U8.pack(type_id), _compile(fields)) for title, (type_id, fields) in MESSAGES.items()}
+_TITLES = {type_id: (title, _SCHEMAS[title][1]) for title, (type_id, fields) in MESSAGES.items()}
+
+
+def encode_message(message: dict) -> bytes:
+    """Returns message packed with its schema, raises ValueError for unknown titles and out of range values."""
+    title = message.get('title')
+    if title not in _SCHEMAS:
+        raise ValueError(f"unknown message {title}")
+    type_byte, schema = _SCHEMAS[title]
+    out = [type_byte]
+    try:
+        _pack_record(schema, message, out)
+    except struct.error as e:
+        raise ValueError(f"cannot encode {title}: {e}")
+    return b''.join(out)
+
+
+def decode_message(data: bytes) -> dict:
+    """Returns message unpacked from bytes, raises ValueError for anything that does not match a schema."""
+    if not data or data[0] not in _TITLES:
+        raise ValueError("unknown message type")
+    title, schema = _TITLES[data[0]]
+    try:
+        message, pos = _unpack_record(schema, data, 1)
+    except (struct.error, IndexError, UnicodeDecodeError) as e:
+        raise ValueError(f"malformed message: {e}")
+    if pos != len(data):
+        raise ValueError("trailing bytes in message")
+    message['title'] = title
+    return message
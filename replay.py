@@ -0,0 +1,240 @@
+import argparse
+import csv
+import json
+import os
+import time
+from multiprocessing import Pool
+from typing import Iterable, Iterator, List, Optional
+
+from agents import BET_ACTIONS, Agent
+from evaluator import SUITS, card_id
+from game import PAID_ACTIONS, Card, GameEngine
+from history import EVENT_FIELDS
+from pacing import Pacing
+
+# Fields every replayed event must match, 'time' is when the hand was written
+COMPARED_FIELDS = tuple(field for field in EVENT_FIELDS if field != 'time')
+_INT_FIELDS = ('hand', 'seq', 'amount', 'bet', 'pot', 'raise_amount', 'start_card')
+# Fields histories recorded before replays were possible do not have
+_SETTINGS_FIELDS = ('raise_amount', 'start_card')
+
+
+class _Stop(Exception):
+    """Stops a replay at the requested event."""
+
+
+class _FixedOrder:
+    """Deck rng that keeps the order, the recorded cards are dealt as they were."""
+
+    def shuffle(self, cards) -> None:
+        pass
+
+
+class ReplayAgent(Agent):
+    """Plays bets and discards of one seat as recorded, stops the replay once `until` events are recorded."""
+
+    def __init__(self, game: GameEngine, bets: List[str], discards: List[List[str]], until: Optional[int] = None):
+        self.game = game
+        self.bets = bets
+        self.discards = discards
+        self.until = until
+
+    def _check_stop(self) -> None:
+        if self.until is not None and len(self.game.hand_events) > self.until:
+            raise _Stop()
+
+    def decide_bet(self, view: dict) -> Optional[str]:
+        self._check_stop()
+        return self.bets.pop() if self.bets else None
+
+    def decide_discard(self, view: dict) -> Optional[List[int]]:
+        self._check_stop()
+        if not self.discards:
+            return []
+        codes = self.discards.pop()
+        return [i for i, card in enumerate(view['hand']) if card.get_code() in codes]
+
+
+def table_state_of(events: List[dict]) -> dict:
+    """
+    Returns GameEngine.table_state the recorded hand started from. The deck order is rebuilt
+    from the cards that were dealt and drawn, so no seed or rng is needed.
+    """
+    stacks = [event for event in events if event['action'] == 'stack']
+    if not stacks:
+        raise ValueError(f"hand {events[0]['hand']} has no stack events, it was recorded before replays were possible")
+    names = [event['seat'] for event in stacks]
+    blinds = {event['action']: event for event in events if event['action'] in ('big_blind', 'small_blind')}
+
+    deals = {event['seat']: event['cards'] for event in events if event['action'] == 'deal'}
+    order = [Card.from_code(deals[name][i]).get_id() for i in range(5) for name in names]
+    seen = set(order)
+    for event in events:
+        if event['action'] == 'discard':
+            seen.update(Card.from_code(code).get_id() for code in event['cards'])
+        elif event['action'] == 'draw':
+            for code in event['cards']:
+                cid = Card.from_code(code).get_id()
+                if cid in seen:
+                    break # taken from the discarded cards at the bottom, every fresh card is placed already
+                order.append(cid)
+                seen.add(cid)
+    placed = set(order)
+    order += [cid for cid in range(card_id(stacks[0]['start_card'], SUITS[0]), 52) if cid not in placed]
+
+    return {
+        'game_id': events[0]['game'],
+        'seed': None,
+        'rounds_played': events[0]['hand'] - 1,
+        'small_blind': blinds['small_blind']['amount'] if 'small_blind' in blinds else 0,
+        'big_blind': blinds['big_blind']['amount'] if 'big_blind' in blinds else 0,
+        'raise_amount': stacks[0]['raise_amount'],
+        'start_card': stacks[0]['start_card'],
+        'action_timeout': None,
+        'history_limit': 1,
+        'players': [{'name': event['seat'], 'stack': event['amount']} for event in stacks],
+        'big_blind_seat': names.index(blinds['big_blind']['seat']),
+        'deck': order,
+        'rng': None,
+    }
+
+
+def replay_hand(events: List[dict], until: Optional[int] = None) -> GameEngine:
+    """
+    Plays the recorded hand (its events, see GameEngine._record) again headlessly and returns
+    the game. With until, the game is stopped at the first decision after event number until,
+    so its state (pot, bets, hands, game.hand_events) is the state of the table at that point.
+    """
+    state = table_state_of(events)
+    game = GameEngine.from_table_state(state, pacing=Pacing.headless_mode(), deck_rng=_FixedOrder())
+    agents = {}
+    for seat in state['players']:
+        name = seat['name']
+        # Reversed, so every decision is a pop from the end
+        bets = [event['action'] for event in reversed(events) if event['seat'] == name and event['action'] in BET_ACTIONS]
+        discards = [event['cards'] for event in reversed(events) if event['seat'] == name and event['action'] == 'discard']
+        agents[name] = ReplayAgent(game, bets, discards, until)
+    game.agents = agents
+    try:
+        game.play_hand()
+    except _Stop:
+        pass
+    return game
+
+
+def verify_hand(events: List[dict]) -> Optional[str]:
+    """Replays the hand, returns None when the replay matches the record, otherwise the first difference."""
+    try:
+        game = replay_hand(events)
+    except (KeyError, ValueError) as e:
+        return f"replay failed: {e}"
+    replayed = game.hand_events
+    for recorded, event in zip(events, replayed):
+        for field in COMPARED_FIELDS:
+            if recorded[field] != event[field]:
+                return (f"event {recorded['seq']} ({recorded['seat']} {recorded['action']}): "
+                        f"{field} is {event[field]!r}, recorded {recorded[field]!r}")
+    if len(replayed) != len(events):
+        return f"replay has {len(replayed)} events, recorded {len(events)}"
+
+    stacks = {event['seat']: event['amount'] for event in events if event['action'] == 'stack'}
+    for event in events:
+        if event['action'] in PAID_ACTIONS:
+            stacks[event['seat']] -= event['amount']
+        elif event['action'] == 'win':
+            stacks[event['seat']] += event['amount']
+    for player in game.get_players():
+        if player.get_stack_amount() != stacks[player.get_player_name()]:
+            return f"stack of {player.get_player_name()} is {player.get_stack_amount()}, recorded {stacks[player.get_player_name()]}"
+    return None
+
+
+def read_hands(path: str) -> Iterator[List[dict]]:
+    """Yields events of every hand of a history file (.jsonl or .csv, see history.HistoryWriter)."""
+    with open(path, encoding='utf-8', newline='') as file:
+        if path.endswith('.jsonl'):
+            records = (json.loads(line) for line in file if line.strip())
+        elif path.endswith('.csv'):
+            records = csv.DictReader(file)
+        else:
+            raise ValueError(f"unknown hand history format: {path}")
+        hand, key = [], None
+        for record in records:
+            for field in _SETTINGS_FIELDS:
+                record.setdefault(field, 0)
+            if isinstance(record['cards'], str):
+                for field in _INT_FIELDS:
+                    record[field] = int(record[field])
+                record['cards'] = record['cards'].split()
+            if (record['game'], record['hand']) != key:
+                if hand:
+                    yield hand
+                hand, key = [], (record['game'], record['hand'])
+            hand.append(record)
+        if hand:
+            yield hand
+
+
+def verify_file(path: str) -> dict:
+    """Replays every hand of the file, returns counts and the hands that differ."""
+    result = {'path': path, 'hands': 0, 'skipped': 0, 'failed': []}
+    for events in read_hands(path):
+        if not any(event['action'] == 'stack' for event in events):
+            result['skipped'] += 1
+            continue
+        result['hands'] += 1
+        difference = verify_hand(events)
+        if difference is not None:
+            result['failed'].append({'game': events[0]['game'], 'hand': events[0]['hand'], 'difference': difference})
+    return result
+
+
+def verify_files(paths: Iterable[str], workers: int = None) -> Iterator[dict]:
+    """Yields verify_file result of every file as soon as it is done, files are verified on a process pool."""
+    paths = list(paths)
+    workers = min(workers or os.cpu_count() or 1, len(paths))
+    if workers <= 1:
+        yield from map(verify_file, paths)
+        return
+    with Pool(workers) as pool:
+        yield from pool.imap_unordered(verify_file, paths)
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description="Replays recorded hands and checks that the engine plays them the same way.")
+    parser.add_argument('files', nargs='+', help="hand history files (.jsonl or .csv)")
+    parser.add_argument('--workers', type=int, default=None, help="processes, default is number of cores")
+    parser.add_argument('--hand', help="show one hand instead, as GAME:HAND")
+    parser.add_argument('--until', type=int, default=None, help="with --hand, stop after this event number")
+    args = parser.parse_args(argv)
+
+    if args.hand:
+        game_id, number = args.hand.split(':')
+        for path in args.files:
+            for events in read_hands(path):
+                if events[0]['game'] == game_id and events[0]['hand'] == int(number):
+                    game = replay_hand(events, until=args.until)
+                    for event in game.hand_events:
+                        print(f"{event['seq']:>3} {event['seat']:<12}{event['action']:<12}{event['amount']:>8}"
+                              f"{event['bet']:>8}{event['pot']:>8}  {' '.join(event['cards'])} {event['detail']}")
+                    state = game.online_game_state()
+                    print(f"pot {state['pot']}, current bet {state['current_bet']}, waiting for {state['waiting_for']}")
+                    return
+        print(f"hand {args.hand} not found")
+        return
+
+    start = time.perf_counter()
+    hands = skipped = failed = 0
+    for result in verify_files(args.files, args.workers):
+        hands += result['hands']
+        skipped += result['skipped']
+        failed += len(result['failed'])
+        for failure in result['failed']:
+            print(f"{result['path']}: hand {failure['game']}:{failure['hand']}: {failure['difference']}")
+    elapsed = time.perf_counter() - start
+    print(f"{hands} hands replayed in {elapsed:.1f}s ({hands / max(elapsed, 1e-9):.0f} hands/s), "
+          f"{failed} differ, {skipped} skipped (recorded without stacks)")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,22 +1,34 @@
 from game import GameEngine, Player
-import pickle
+from snapshot import TableStore
 
 if __name__ == "__main__":
-    _input = input("Load a game? (y/n)[n]: ")
-    if _input.lower() == 'y':
-        game = pickle.load(open('game_save.pkl', 'rb'))
-    else:
-        player1 = Player(1000, 'Satori')
-        player2 = Player(1000, 'Koishi')
+    # Every hand is journaled as soon as it ends, so the game survives a crash. It is played
+    # in its own files and replaces the saved game only when the player saves it.
+    save = TableStore('game_save')
+    store = TableStore('game_save.playing')
+    game = None
+    if store.exists():
+        _input = input("Resume the game that was not finished? (y/n)[y]: ")
+        if _input.lower() != 'n':
+            game = store.load()
+    if game is None:
+        _input = input("Load a game? (y/n)[n]: ")
+        if _input.lower() == 'y' and save.exists():
+            game = save.load(keep_journaling=False)
+        else:
+            if _input.lower() == 'y':
+                print("No saved game, starting a new one.")
+            player1 = Player(1000, 'Satori')
+            player2 = Player(1000, 'Koishi')
 
-        game = GameEngine([player1, player2], start_card=7)
+            game = GameEngine([player1, player2], start_card=7)
+        store.track(game)
 
-    
-    game.play_round()
+    game.play_round(journal=store)
 
     _input = input("Save the game? (y/n)[n]: ")
     if _input.lower() == 'y':
-        with open('game_save.pkl', 'wb') as f:
-            pickle.dump(game, f)
+        store.move_to('game_save')
     else:
-        print("Game not saved.")
\ No newline at end of file
+        store.remove()
+        print("Game not saved.")
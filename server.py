@@ -1,133 +1,202 @@
-import socket
-from _thread import *
-import pickle
+import asyncio
 import sys
-from game import GameEngine
-from game import Player
+from lobby import Lobby
+from protocol import decode_message, encode_message, make_delta, read_frame, write_frame
+
+# Transport buffer above which writes wait for a slow client to catch up
+WRITE_BUFFER_HIGH = 256 * 1024
+WRITE_BUFFER_LOW = 64 * 1024
+
+class ClientConnection:
+    """
+    Outgoing side of one client. Replies are sent in order, game states are coalesced:
+    a client that reads slowly skips intermediate states and gets the latest one.
+    After the first full state only deltas against the last sent state go out.
+    """
+
+    def __init__(self, conn_id, writer):
+        self.conn_id = conn_id
+        self.writer = writer
+        self.replies = []
+        self.latest_state = None
+        self.sent_state = None
+        self.ready = asyncio.Event()
+
+    def send(self, message: dict) -> None:
+        self.replies.append(message)
+        self.ready.set()
+
+    def push_state(self, game_state: dict) -> None:
+        self.latest_state = game_state
+        self.ready.set()
+
+    async def sender(self):
+        while True:
+            await self.ready.wait()
+            self.ready.clear()
+            while self.replies:
+                reply = self.replies.pop(0)
+                if reply.get('title') == 'game_state' and 'version' in reply:
+                    self.sent_state = reply
+                await write_frame(self.writer, encode_message(reply))
+            if self.latest_state is not None:
+                game_state, self.latest_state = self.latest_state, None
+                message = game_state
+                if self.sent_state is not None:
+                    delta = make_delta(self.sent_state, game_state)
+                    if delta is not None:
+                        if 'changes' not in delta and 'players' not in delta:
+                            continue
+                        message = delta
+                self.sent_state = game_state if 'version' in game_state else None
+                await write_frame(self.writer, encode_message(message))
 
 class Server:
-    def __init__(self, host='127.0.0.1', port=55557):
-
-        self.current_player = 1
-        self.current_players = 1
-        self.player_turn = 'Player1'
-
-        s = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-
+    def __init__(self, host='127.0.0.1', port=55557, max_tables=32, seats_per_table=6, wal_path='server.wal'):
+        self.host = host
+        self.port = port
+
+        self.next_connection_id = 1
+        # Every table is played by a worker of the shared pool, running games are
+        # logged to wal_path (None turns it off) and rebuilt from it after a restart
+        self.lobby = Lobby(max_workers=max_tables, max_seats=seats_per_table, wal_path=wal_path)
+        self.connections = {}
+        self.pending_broadcasts = set()
+        self.loop = None
+
+    def run(self):
+        """Serves all connections on one event loop until interrupted."""
         try:
-            s.bind((host, port))
-        except socket.error as e:
+            asyncio.run(self.serve())
+        except OSError as e:
             print(str(e))
             sys.exit()
-
-        s.listen()
-        print(f"Server started on {host}:{port}")
-
-        self.is_game_active = False
-        self.game = None
-        self.players = []
-        self.game_state = {}
-
-        while True:
-            conn, addr = s.accept()
-            print(f"Connected to {addr}")
-            
-            start_new_thread(self.threaded_client, (conn, addr, self.current_player))
-            if self.current_player == 1:
-                start_new_thread(self.start_game, ())
-            self.current_player += 1
-            self.current_players += 1
-
-    def get_game_state(self, playerId=None):
-        if self.game is not None:
-            self.game_state = self.game.online_game_state(for_player=f'player{playerId}')
-            try:
-                self.game_state['title'] = 'game_state'
-                self.game_state['current_player'] = self.player_turn
-                self.game_state['destined_for'] = self.players[playerId-1].get_player_name()
-            except Exception as e:
-                print(f"Error broadcasting to {self.players[playerId-1].get_player_name()}: {e}")
-        else:
-            self.game_state = {
-                'title': 'game_state',
-                'error': "Game not started yet."
-            }
-        return self.game_state
-
-    def start_game(self):
-        while not self.is_game_active:
-            continue
-        print("Starting game...")
-        
-        for i in range(self.current_players-1):
-            player = Player(1000, "Player" + str(i+1))
-            self.players.append(player)
-        
-        self.game = GameEngine(self.players)
-        self.is_game_active = True
-        print("Game started with players:", self.players)
-        self.game.play_round()
-
-    def threaded_client(self, conn, addr, current_player):
-        print(f"New connection from {addr}, player number: {current_player}")
-        conn.send(str(current_player).encode("utf-8"))
-        reply = "Welcome"
-        while True:
-            try:
-                data = conn.recv(2048)
-                decoded_data = data.decode("utf-8")
-
-                print(f"is_game_active: {self.is_game_active}")
-                
-                if decoded_data.startswith('action_'):
-                    action_data = decoded_data.split('_')
-                    player_id = action_data[1]
-                    action = action_data[2]
-                    print(f"Received action from {addr}: {player_id} performed action '{action}'")
-                    
-                    self.game.selected_choice = str(action)
-
-                if decoded_data.startswith('exchange_'):
-                    exchange_data = decoded_data.split('_')
-                    player_id = exchange_data[1]
-                    exchange = exchange_data[2]
-                    print(f"Received exchange from {addr}: {player_id} exchanged '{exchange}'")
-                    
-                    self.game.selected_choice = str(exchange)
-
-                if decoded_data == "start_game":
-                    print(f"Player {current_player} requested to start the game")
-                    if self.current_players < 2:
-                        reply = f"Not enough players to start the game. {self.current_players} player(s) connected. Which is {self.current_players < 2}"
-                    else:
-                        self.is_game_active = True
-                        print("Game started successfully")
-
-                if decoded_data.startswith('send_game_state_'):
-                    print(f"Recived game state request from {addr}: {decoded_data}")
-                    reply = self.get_game_state(int(decoded_data.split('_')[3]))
-
-                if decoded_data == "is_game_active":
-                    reply = str(self.is_game_active)
-
-                if not data:
+        finally:
+            self.lobby.shutdown()
+
+    async def serve(self):
+        self.loop = asyncio.get_running_loop()
+        for table in self.lobby.recover():
+            self.watch_table(table)
+            print(f"Recovered table {table.table_id} at hand {table.game.rounds_played + 1}")
+        server = await asyncio.start_server(self.handle_client, self.host, self.port)
+        print(f"Server started on {self.host}:{self.port}")
+        async with server:
+            await server.serve_forever()
+
+    def get_game_state(self, conn_id):
+        return self.lobby.table_of(conn_id).game_state(conn_id)
+
+    def schedule_broadcast(self, table) -> None:
+        """Pushes state of the table once, no matter how many changes happened since the last push."""
+        if table.table_id in self.pending_broadcasts:
+            return
+        self.pending_broadcasts.add(table.table_id)
+        self.loop.call_soon(self.broadcast, table)
+
+    def broadcast(self, table) -> None:
+        self.pending_broadcasts.discard(table.table_id)
+        conn_ids = [conn_id for conn_id in table.seated() + list(table.spectators) if conn_id in self.connections]
+        for conn_id, game_state in table.game_states(conn_ids).items():
+            self.connections[conn_id].push_state(game_state)
+
+    def watch_table(self, table) -> None:
+        """Subscribes to the game of the table, the game thread only wakes up the event loop."""
+        table.game.subscribe(lambda version: self.loop.call_soon_threadsafe(self.schedule_broadcast, table))
+
+    def handle_message(self, message: dict, conn_id):
+        """Handles one client message, returns reply or None when the pushed game state is enough."""
+        title = message['title']
+        try:
+            if title == 'action' or title == 'exchange':
+                print(f"Received {title}: connection {conn_id} chose '{message['choice']}'")
+                self.lobby.route(conn_id, message['choice'])
+                return None
+
+            if title == 'start_game':
+                print(f"Connection {conn_id} requested to start the game")
+                self.lobby.start_table(conn_id)
+                table = self.lobby.table_of(conn_id)
+                self.watch_table(table)
+                self.schedule_broadcast(table)
+                print(f"Game started at table {table.table_id}")
+                return None
+
+            if title == 'send_game_state':
+                return self.get_game_state(conn_id)
+
+            if title == 'is_game_active':
+                return {'title': 'is_game_active', 'active': self.lobby.table_of(conn_id).is_active}
+
+            if title == 'list_tables':
+                return {'title': 'tables', 'tables': self.lobby.list_tables()}
+
+            if title == 'create_table':
+                self.lobby.join(conn_id, self.lobby.create_table().table_id)
+                self.schedule_broadcast(self.lobby.table_of(conn_id))
+                return None
+
+            if title == 'join':
+                self.lobby.join(conn_id, message['table_id'])
+                self.schedule_broadcast(self.lobby.table_of(conn_id))
+                return None
+
+            if title == 'spectate':
+                self.lobby.spectate(conn_id, message['table_id'])
+                self.schedule_broadcast(self.lobby.table_of(conn_id))
+                return None
+        except (KeyError, ValueError) as e:
+            return {'title': 'game_state', 'error': str(e)}
+
+        return {'title': 'unknown_message', 'error': f"Unknown message: {title}"}
+
+    async def handle_client(self, reader, writer):
+        addr = writer.get_extra_info('peername')
+        writer.transport.set_write_buffer_limits(high=WRITE_BUFFER_HIGH, low=WRITE_BUFFER_LOW)
+        conn_id = self.next_connection_id
+        self.next_connection_id += 1
+        try:
+            table = self.lobby.join(conn_id)
+        except ValueError as e:
+            print(f"Refused connection from {addr}: {e}")
+            await write_frame(writer, encode_message({'title': 'unknown_message', 'error': str(e)}))
+            writer.close()
+            return
+        seat = table.seats.index(conn_id) + 1
+        print(f"New connection from {addr}, table {table.table_id}, player number: {seat}")
+
+        connection = ClientConnection(conn_id, writer)
+        sender = None
+        try:
+            await write_frame(writer, encode_message({'title': 'welcome', 'seat': seat, 'table_id': table.table_id}))
+            self.connections[conn_id] = connection
+            sender = asyncio.create_task(connection.sender())
+            self.schedule_broadcast(table)
+            while True:
+                data = await read_frame(reader)
+                if data is None:
                     print(f"Connection closed by {addr}")
                     break
-                else:
-                    print(f"Received from {addr}: {reply}")
-
-                if isinstance(reply, dict):
-                    reply = pickle.dumps(reply)
-                elif isinstance(reply, str):
-                    reply = reply.encode("utf-8")
-                conn.sendall(reply)
-            except Exception as e:
-                print(f"Error with {addr}: {e}")
-                break
-        
+
+                try:
+                    reply = self.handle_message(decode_message(data), conn_id)
+                except ValueError as e:
+                    reply = {'title': 'unknown_message', 'error': str(e)}
+                if reply is not None:
+                    connection.send(reply)
+        except Exception as e:
+            print(f"Error with {addr}: {e}")
+
         print(f"Closing connection with {addr}")
-        conn.close()
+        if sender is not None:
+            sender.cancel()
+        self.connections.pop(conn_id, None)
+        table = self.lobby.connections.get(conn_id)
+        self.lobby.leave(conn_id)
+        if table is not None and table.table_id in self.lobby.tables:
+            self.schedule_broadcast(table)
+        writer.close()
 
 if __name__ == "__main__":
     server = Server()
-    
\ No newline at end of file
+    server.run()
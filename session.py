@@ -0,0 +1,40 @@
+from typing import Callable, Iterator, Optional
+
+from game import GameEngine
+
+
+class Session:
+    """
+    Plays hands of one game in a loop with constant stack and memory.
+    Iterating over a session yields the result of every hand (see GameEngine.play_hand),
+    blinds move one seat after every hand. The session ends after rounds hands,
+    when stop(result) returns True or when blinds can't be posted anymore.
+    """
+
+    def __init__(self, game: GameEngine, rounds: Optional[int] = None,
+                 stop: Callable[[dict], bool] = None, sink: Callable[[dict], None] = None):
+        self.game = game
+        self.rounds = rounds
+        self.stop = stop
+        self.sink = sink # receives every result, e.g. to write history to storage
+        self.played = 0
+
+    def __iter__(self) -> Iterator[dict]:
+        while self.rounds is None or self.played < self.rounds:
+            if not self.game.can_post_blinds():
+                self.game.message = 'Player doesn\'t have enough funds for blinds, game will end'
+                return
+            result = self.game.play_hand()
+            self.played += 1
+            self.game.rotate_blinds()
+            if self.sink is not None:
+                self.sink(result)
+            yield result
+            if self.stop is not None and self.stop(result):
+                return
+
+    def run(self) -> int:
+        """Plays the whole session without keeping results, returns number of hands played."""
+        for _ in self:
+            pass
+        return self.played
@@ -0,0 +1,45 @@
+import random
+from array import array
+
+import numpy as np
+
+from evaluator import SUITS, card_id
+
+
+def shuffled_decks(count: int, start_card: int = 2, seed=None) -> np.ndarray:
+    """Returns (count, deck size) uint8 array, every row holds card ids of one shuffled deck."""
+    ids = np.arange(card_id(start_card, SUITS[0]), 52, dtype=np.uint8)
+    rng = np.random.default_rng(seed)
+    return rng.permuted(np.tile(ids, (count, 1)), axis=1)
+
+
+class BatchShuffler:
+    """
+    Deck rng for simulations: permutations are generated batch_size at a time with NumPy
+    and applied to the deck, several times faster than random.shuffle per deck.
+    Shuffles of any other length (partly dealt decks) fall back to random.Random.
+    """
+
+    def __init__(self, size: int = 52, seed=None, batch_size: int = 4096):
+        self.size = size
+        self.batch_size = batch_size
+        self.__rng_ = np.random.default_rng(seed)
+        self.__fallback_ = random.Random(int(self.__rng_.integers(1 << 62)))
+        self.__identity_ = np.arange(size, dtype=np.uint8)
+        self.__permutations_ = None
+        self.__next_ = batch_size
+
+    def _refill(self) -> None:
+        self.__permutations_ = self.__rng_.permuted(np.tile(self.__identity_, (self.batch_size, 1)), axis=1)
+        self.__next_ = 0
+
+    def shuffle(self, cards) -> None:
+        """Shuffles array('B') of card ids (or any mutable sequence) in place."""
+        if len(cards) != self.size or not isinstance(cards, array) or cards.typecode != 'B':
+            self.__fallback_.shuffle(cards)
+            return
+        if self.__next_ == self.batch_size:
+            self._refill()
+        permutation = self.__permutations_[self.__next_]
+        self.__next_ += 1
+        cards[:] = array('B', np.frombuffer(cards, dtype=np.uint8)[permutation].tobytes())
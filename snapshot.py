@@ -0,0 +1,127 @@
+import json
+import os
+from typing import Optional
+
+from game import GameEngine
+from pacing import Pacing
+
+SNAPSHOT_FORMAT = 'poker-table'
+SNAPSHOT_VERSION = 1
+
+
+class TableStore:
+    """
+    Saved table: a versioned JSON snapshot of GameEngine.table_state() and an append-only
+    journal (JSON Lines) of the hands played since. Every hand appends its events only,
+    a new snapshot is taken every snapshot_every hands and starts an empty journal.
+    Loading restores the snapshot and replays the journal on top of it.
+    Journal a Session with Session(game, sink=store.write).
+    """
+
+    def __init__(self, path: str = 'game_save', snapshot_every: int = 100):
+        self.snapshot_path = path + '.snapshot.json'
+        self.journal_path = path + '.journal.jsonl'
+        self.snapshot_every = snapshot_every
+        self.game: Optional[GameEngine] = None
+        self.__journal_ = None
+        self.__since_snapshot_ = 0
+
+    def __enter__(self) -> 'TableStore':
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def exists(self) -> bool:
+        return os.path.exists(self.snapshot_path)
+
+    def track(self, game: GameEngine) -> None:
+        """Starts saving the game, takes its first snapshot."""
+        self.game = game
+        self.checkpoint()
+
+    def checkpoint(self) -> None:
+        """Writes snapshot of the table, then empties the journal."""
+        snapshot = {'format': SNAPSHOT_FORMAT, 'version': SNAPSHOT_VERSION, 'table': self.game.table_state()}
+        temporary = self.snapshot_path + '.tmp'
+        with open(temporary, 'w', encoding='utf-8') as file:
+            json.dump(snapshot, file, separators=(',', ':'))
+            file.flush()
+            os.fsync(file.fileno())
+        # A crash before the journal is emptied is harmless, hands already in the snapshot are skipped on load
+        os.replace(temporary, self.snapshot_path)
+        if self.__journal_ is not None:
+            self.__journal_.close()
+        self.__journal_ = open(self.journal_path, 'w', encoding='utf-8')
+        self.__since_snapshot_ = 0
+
+    def write(self, result: dict) -> None:
+        """Appends finished hand (GameEngine.play_hand result) to the journal."""
+        record = {'hand': result['round'], 'events': result['events']}
+        self.__journal_.write(json.dumps(record, ensure_ascii=False, separators=(',', ':')) + '\n')
+        self.__journal_.flush()
+        self.__since_snapshot_ += 1
+        if self.__since_snapshot_ >= self.snapshot_every:
+            self.checkpoint()
+
+    def load(self, pacing: Pacing = None, agents: dict = None, keep_journaling: bool = True) -> GameEngine:
+        """
+        Returns saved game: the snapshot with the journaled hands replayed, keeps journaling it.
+        With keep_journaling False the saved files are only read.
+        """
+        with open(self.snapshot_path, encoding='utf-8') as file:
+            snapshot = json.load(file)
+        if snapshot.get('format') != SNAPSHOT_FORMAT:
+            raise ValueError(f"{self.snapshot_path} is not a table snapshot")
+        if snapshot.get('version') != SNAPSHOT_VERSION:
+            raise ValueError(f"unsupported snapshot version {snapshot.get('version')}, expected {SNAPSHOT_VERSION}")
+        game = GameEngine.from_table_state(snapshot['table'], pacing=pacing, agents=agents)
+
+        replayed, valid_size = 0, 0
+        if os.path.exists(self.journal_path):
+            with open(self.journal_path, 'rb') as file:
+                for line in file:
+                    if not line.endswith(b'\n'):
+                        break # last record was cut short by a crash
+                    record = json.loads(line)
+                    valid_size += len(line)
+                    if record['hand'] <= game.rounds_played:
+                        continue
+                    if record['hand'] != game.rounds_played + 1:
+                        raise ValueError(f"journal skips from hand {game.rounds_played} to {record['hand']}")
+                    game.apply_hand(record['events'])
+                    game.rotate_blinds()
+                    replayed += 1
+
+        if not keep_journaling:
+            return game
+        self.game = game
+        if self.__journal_ is not None:
+            self.__journal_.close()
+        self.__journal_ = open(self.journal_path, 'a', encoding='utf-8')
+        self.__journal_.truncate(valid_size)
+        self.__since_snapshot_ = replayed
+        return game
+
+    def move_to(self, path: str) -> None:
+        """Takes a snapshot and moves the saved table to path, replacing the table saved there."""
+        self.checkpoint()
+        self.close()
+        target = TableStore(path)
+        # The old journal goes first, it must never be replayed on top of the new snapshot
+        if os.path.exists(target.journal_path):
+            os.remove(target.journal_path)
+        os.replace(self.snapshot_path, target.snapshot_path)
+        os.remove(self.journal_path)
+
+    def remove(self) -> None:
+        """Deletes the saved table."""
+        self.close()
+        for path in (self.snapshot_path, self.journal_path):
+            if os.path.exists(path):
+                os.remove(path)
+
+    def close(self) -> None:
+        if self.__journal_ is not None:
+            self.__journal_.close()
+            self.__journal_ = None
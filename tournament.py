@@ -0,0 +1,153 @@
+import argparse
+import math
+import os
+import time
+from multiprocessing import Pool
+from typing import List
+
+from bots import BOTS
+from game import Deck, GameEngine, Player
+from pacing import Pacing
+from session import Session
+from shuffler import BatchShuffler
+
+# Games are split into shards of fixed size, every shard has its own seed,
+# so results depend on the seed only, not on the number of workers.
+GAMES_PER_SHARD = 20
+
+
+def shard_seed(seed: int, shard: int) -> int:
+    return seed * 1_000_003 + shard
+
+
+def seat_labels(bots: List[str]) -> List[str]:
+    """Returns unique name of every seat, like 'pairs1', 'random2'."""
+    return [f'{kind}{i + 1}' for i, kind in enumerate(bots)]
+
+
+def _empty_stats() -> dict:
+    return {'hands': 0, 'chips': 0, 'chips_sq': 0, 'hands_won': 0.0, 'games': 0, 'games_won': 0.0}
+
+
+def play_shard(task: tuple) -> dict:
+    """Plays games of one shard, returns stats of every seat label."""
+    shard, games, config = task
+    seed = shard_seed(config['seed'], shard)
+    shuffler = BatchShuffler(seed=seed) # shared by decks of all games in the shard
+    labels = seat_labels(config['bots'])
+    stats = {label: _empty_stats() for label in labels}
+    for game_index in games:
+        # Every game moves the seats by one, so no bot keeps the same position
+        shift = game_index % len(labels)
+        seating = labels[shift:] + labels[:shift]
+        kinds = dict(zip(labels, config['bots']))
+        players = [Player(config['stack'], label) for label in seating]
+        bots = {}
+        for label in seating:
+            bot = BOTS[kinds[label]]()
+            if hasattr(bot, 'rng'):
+                bot.rng.seed(seed * 7 + game_index * 31 + labels.index(label))
+            bots[label] = bot
+        game = GameEngine(players, deck=Deck(rng=shuffler),
+                          small_blind=config['small_blind'], big_blind=config['big_blind'],
+                          pacing=Pacing.headless_mode(), history_limit=1, agents=bots)
+
+        stacks = {label: config['stack'] for label in labels}
+        for result in Session(game, rounds=config['hands']):
+            for label, stack in result['stacks'].items():
+                change = stack - stacks[label]
+                stacks[label] = stack
+                stats[label]['hands'] += 1
+                stats[label]['chips'] += change
+                stats[label]['chips_sq'] += change * change
+            for winner in result['winners']:
+                stats[winner]['hands_won'] += 1 / len(result['winners'])
+
+        best = max(stacks.values())
+        game_winners = [label for label, stack in stacks.items() if stack == best]
+        for label in labels:
+            stats[label]['games'] += 1
+            if label in game_winners:
+                stats[label]['games_won'] += 1 / len(game_winners)
+    return stats
+
+
+def run_tournament(bots: List[str], games: int = 1000, hands: int = 100, stack: int = 1000,
+                   small_blind: int = 25, big_blind: int = 50, workers: int = None, seed: int = 0) -> dict:
+    """Plays games between bots on a process pool, returns summed stats of every seat label."""
+    unknown = [kind for kind in bots if kind not in BOTS]
+    if unknown:
+        raise ValueError(f"unknown bots: {', '.join(unknown)}")
+    if len(bots) < 2:
+        raise ValueError("at least two bots are needed")
+    config = {'bots': list(bots), 'hands': hands, 'stack': stack,
+              'small_blind': small_blind, 'big_blind': big_blind, 'seed': seed}
+    tasks = [(shard, range(start, min(start + GAMES_PER_SHARD, games)), config)
+             for shard, start in enumerate(range(0, games, GAMES_PER_SHARD))]
+
+    totals = {label: _empty_stats() for label in seat_labels(bots)}
+    workers = workers or os.cpu_count() or 1
+    if workers == 1:
+        results = map(play_shard, tasks)
+    else:
+        pool = Pool(workers)
+        results = pool.imap_unordered(play_shard, tasks)
+    for stats in results:
+        for label, values in stats.items():
+            for key, value in values.items():
+                totals[label][key] += value
+    if workers != 1:
+        pool.close()
+        pool.join()
+    return totals
+
+
+def summarize(totals: dict, z: float = 1.96) -> List[dict]:
+    """Returns chip EV per hand and win rates of every seat label with their confidence intervals."""
+    rows = []
+    for label, stats in totals.items():
+        hands, games = max(stats['hands'], 1), max(stats['games'], 1)
+        ev = stats['chips'] / hands
+        variance = max(stats['chips_sq'] / hands - ev * ev, 0.0)
+        game_win_rate = stats['games_won'] / games
+        rows.append({
+            'bot': label,
+            'hands': stats['hands'],
+            'chip_ev': ev,
+            'chip_ev_ci': z * math.sqrt(variance / hands),
+            'hand_win_rate': stats['hands_won'] / hands,
+            'game_win_rate': game_win_rate,
+            'game_win_rate_ci': z * math.sqrt(game_win_rate * (1 - game_win_rate) / games),
+        })
+    return rows
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description="Plays headless games between bots and reports their results.")
+    parser.add_argument('bots', nargs='+', choices=sorted(BOTS), help="bot of every seat")
+    parser.add_argument('--games', type=int, default=1000)
+    parser.add_argument('--hands', type=int, default=100, help="hands per game (fewer when somebody goes broke)")
+    parser.add_argument('--stack', type=int, default=1000)
+    parser.add_argument('--small-blind', type=int, default=25)
+    parser.add_argument('--big-blind', type=int, default=50)
+    parser.add_argument('--workers', type=int, default=None, help="processes, default is number of cores")
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    totals = run_tournament(args.bots, games=args.games, hands=args.hands, stack=args.stack,
+                            small_blind=args.small_blind, big_blind=args.big_blind,
+                            workers=args.workers, seed=args.seed)
+    elapsed = time.perf_counter() - start
+    rows = summarize(totals)
+
+    hands = sum(row['hands'] for row in rows) // len(rows)
+    print(f'{args.games} games, {hands} hands in {elapsed:.1f}s ({hands / elapsed:.0f} hands/s)')
+    print(f'{"bot":<12}{"chips/hand":>22}{"hands won":>12}{"games won":>20}')
+    for row in rows:
+        print(f'{row["bot"]:<12}{row["chip_ev"]:>12.2f} ± {row["chip_ev_ci"]:<7.2f}'
+              f'{row["hand_win_rate"]:>12.1%}{row["game_win_rate"]:>11.1%} ± {row["game_win_rate_ci"]:.1%}')
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,179 @@
+import json
+import os
+import threading
+from typing import Dict, Iterator, List
+
+from game import GameEngine
+
+# Records (JSON Lines), every one has 'type' and 'table' (table id):
+#   table    - table started: max_seats, starting_stack and state (GameEngine.table_state)
+#   state    - table state between two hands, decisions before it are not needed anymore
+#   decision - seat, kind ('bet' or 'discard') and choice, logged before the game applies it
+#   end      - game of the table is over
+#   error    - game of the table crashed with error, it is not recovered either
+
+
+class WriteAheadLog:
+    """
+    Durable log shared by all tables of a server. Records are buffered and written by one
+    flusher thread, which fsyncs once for all records that arrived while the previous fsync
+    ran (group commit). append waits until its record is on disk, so many tables waiting at
+    the same time share one fsync instead of paying one each.
+    """
+
+    def __init__(self, path: str = 'server.wal'):
+        self.path = path
+        self.records = 0
+        self.commits = 0
+        self.__file_ = open(path, 'a', encoding='utf-8')
+        self.__changed_ = threading.Condition()
+        self.__pending_: List[str] = []
+        self.__appended_ = 0
+        self.__durable_ = 0
+        self.__closed_ = False
+        self.__flusher_ = threading.Thread(target=self._flush_loop, name='wal', daemon=True)
+        self.__flusher_.start()
+
+    def append(self, record: dict, wait: bool = True) -> int:
+        """Adds record to the log, returns its number. Waits until it is durable unless wait is False."""
+        line = json.dumps(record, ensure_ascii=False, separators=(',', ':')) + '\n'
+        with self.__changed_:
+            if self.__closed_:
+                raise ValueError("write-ahead log is closed")
+            self.__pending_.append(line)
+            self.__appended_ += 1
+            number = self.__appended_
+            self.__changed_.notify_all()
+        if wait:
+            self.wait(number)
+        return number
+
+    def wait(self, number: int) -> None:
+        """Waits until record number (returned by append) is durable."""
+        with self.__changed_:
+            while self.__durable_ < number:
+                self.__changed_.wait()
+
+    def sync(self) -> None:
+        """Waits until every appended record is durable."""
+        self.wait(self.__appended_)
+
+    @property
+    def closed(self) -> bool:
+        return self.__closed_
+
+    def _flush_loop(self) -> None:
+        while True:
+            with self.__changed_:
+                while not self.__pending_ and not self.__closed_:
+                    self.__changed_.wait()
+                if not self.__pending_:
+                    return
+                batch, self.__pending_ = self.__pending_, []
+                last = self.__appended_
+            # Records appended meanwhile wait for the next batch
+            self.__file_.write(''.join(batch))
+            self.__file_.flush()
+            os.fsync(self.__file_.fileno())
+            with self.__changed_:
+                self.records += len(batch)
+                self.commits += 1
+                self.__durable_ = last
+                self.__changed_.notify_all()
+
+    def close(self) -> None:
+        """Writes remaining records and closes the log."""
+        with self.__changed_:
+            self.__closed_ = True
+            self.__changed_.notify_all()
+        self.__flusher_.join()
+        self.__file_.close()
+
+
+def read_records(path: str) -> Iterator[dict]:
+    """Yields records of the log, a last record cut short by a crash is left out."""
+    if not os.path.exists(path):
+        return
+    with open(path, 'rb') as file:
+        for line in file:
+            if not line.endswith(b'\n'):
+                return
+            yield json.loads(line)
+
+
+def recover_tables(path: str) -> Dict[int, dict]:
+    """
+    Returns tables whose game was still running, by table id: the 'table' record
+    with state replaced by the last logged state and the decisions made since.
+    """
+    tables = {}
+    for record in read_records(path):
+        kind, table_id = record['type'], record['table']
+        if kind == 'table':
+            tables[table_id] = dict(record, decisions=[])
+        elif table_id not in tables:
+            continue
+        elif kind == 'state':
+            tables[table_id]['state'] = record['state']
+            tables[table_id]['decisions'] = []
+        elif kind == 'decision':
+            tables[table_id]['decisions'].append(record)
+        elif kind in ('end', 'error'):
+            del tables[table_id]
+    return tables
+
+
+def compact(path: str, tables: Dict[int, dict]) -> None:
+    """Replaces the log with only what is needed to recover given tables (see recover_tables)."""
+    temporary = path + '.tmp'
+    with open(temporary, 'w', encoding='utf-8') as file:
+        for table in tables.values():
+            record = {key: value for key, value in table.items() if key != 'decisions'}
+            file.write(json.dumps(record, ensure_ascii=False, separators=(',', ':')) + '\n')
+            for decision in table['decisions']:
+                file.write(json.dumps(decision, ensure_ascii=False, separators=(',', ':')) + '\n')
+        file.flush()
+        os.fsync(file.fileno())
+    os.replace(temporary, path)
+
+
+class TableLog:
+    """
+    Logs one table to the write-ahead log: every decision of its game before it is applied
+    and the table state every checkpoint_every hands. A recovered game first replays
+    `replaying` decisions that are already in the log, they are not logged again and
+    the game runs headless until the last of them, then gets its pacing back.
+    Pass it as journal to GameEngine.play_round.
+    """
+
+    def __init__(self, wal: WriteAheadLog, table_id: int, game: GameEngine,
+                 checkpoint_every: int = 20, replaying: int = 0, pacing=None):
+        self.wal = wal
+        self.table_id = table_id
+        self.game = game
+        self.checkpoint_every = checkpoint_every
+        self.__replaying_ = replaying
+        self.__pacing_ = pacing
+        game.decision_log = self.decision
+
+    def decision(self, record: dict) -> None:
+        if self.__replaying_:
+            self.__replaying_ -= 1
+            if not self.__replaying_ and self.__pacing_ is not None:
+                self.game.pacing = self.__pacing_
+            return
+        self.wal.append(dict(record, type='decision', table=self.table_id))
+
+    def checkpoint(self) -> None:
+        self.wal.append({'type': 'state', 'table': self.table_id, 'state': self.game.table_state()})
+
+    def write(self, result: dict) -> None:
+        """Logs table state after every checkpoint_every hands (result of GameEngine.play_hand)."""
+        if result['round'] % self.checkpoint_every == 0:
+            self.checkpoint()
+
+    def end(self) -> None:
+        self.wal.append({'type': 'end', 'table': self.table_id})
+
+    def failed(self, error: Exception) -> None:
+        self.wal.append({'type': 'error', 'table': self.table_id, 'error': repr(error)})